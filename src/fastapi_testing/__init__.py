@@ -2,10 +2,10 @@ from fastapi_testing.async_fastapi_testing import (
     AsyncTestClient,
     AsyncTestResponse,
     AsyncTestServer,
+    BatchingWebSocketHelper,
     Config,
     InvalidResponseTypeError,
     PortGenerator,
-    UvicornTestServer,
     WebSocketConfig,
     WebSocketHelper,
     create_test_server,
@@ -16,6 +16,7 @@ __all__ = [
     "AsyncTestClient",
     "AsyncTestResponse",
     "AsyncTestServer",
+    "BatchingWebSocketHelper",
     "Config",
     "InvalidResponseTypeError",
     "PortGenerator",
@@ -25,3 +26,12 @@ __all__ = [
     "create_test_server",
     "global_config",
 ]
+
+
+def __getattr__(name: str):
+    # UvicornTestServer is created on first access so importing the package does not load uvicorn
+    if name == "UvicornTestServer":
+        from fastapi_testing.async_fastapi_testing import UvicornTestServer
+
+        return UvicornTestServer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
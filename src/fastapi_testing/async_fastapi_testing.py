@@ -1,22 +1,41 @@
+from __future__ import annotations
+
 import asyncio
+import functools
 import json
 import logging
 import os
-from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager, suppress
-from dataclasses import dataclass
-from typing import Any
-
-import httpx
-import uvicorn
-from fastapi import FastAPI
-from fastapi.applications import AppType
-from starlette.types import Lifespan
-from websockets.asyncio.client import ClientConnection, connect
-from websockets.protocol import State
+import random
+import socket
+import ssl
+import struct
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import AsyncGenerator, Callable, Generator, Mapping, Sequence
+from contextlib import asynccontextmanager, closing, contextmanager, suppress
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, TypeVar
+from urllib.parse import urlsplit
+
+# httpx, uvicorn, fastapi and websockets are imported where they are first used, so that importing
+# the package (e.g. only for Config or PortGenerator) does not pay for loading the whole stack.
+if TYPE_CHECKING:
+    import httpx
+    import uvicorn
+    from fastapi.applications import AppType
+    from starlette.types import Lifespan
+    from websockets.asyncio.client import ClientConnection
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
 # Configuration Constants
 DEFAULT_WS_MESSAGE_SIZE = 2**20  # 1MB
 DEFAULT_WS_QUEUE_SIZE = 32
@@ -24,6 +43,34 @@ DEFAULT_KEEPALIVE_CONNS = 20
 DEFAULT_MAX_CONNS = 100
 DEFAULT_WS_RETRY_ATTEMPTS = 3
 DEFAULT_WS_RETRY_DELAY = 1.0
+DEFAULT_WS_BATCH_SIZE = 128
+DEFAULT_WS_FLUSH_INTERVAL_MS = 1.0
+
+_LOOPBACK_HOSTS = frozenset({"127.0.0.1", "localhost", "::1"})
+
+# Upper bound for a single backoff sleep between WebSocket connect attempts
+_WS_MAX_RETRY_DELAY = 5.0
+
+# Length prefix used to frame each message inside a batched WebSocket frame
+_BATCH_LENGTH_PREFIX = struct.Struct("<I")
+
+# WebSocket JSON codec, using orjson when it is installed
+if orjson is not None:
+
+    def _json_dumps_bytes(data: Any) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+    def _json_dumps(data: Any) -> str:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    _json_loads = orjson.loads
+else:  # pragma: no cover
+
+    def _json_dumps_bytes(data: Any) -> bytes:
+        return json.dumps(data).encode()
+
+    _json_dumps = json.dumps
+    _json_loads = json.loads
 
 
 class Config:
@@ -105,13 +152,16 @@ class InvalidResponseTypeError(Exception):
     pass
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class WebSocketConfig:
     """WebSocket connection configuration.
 
+    Configurations are immutable and hashable, so they can key connection lookups. Subprotocols
+    are stored as a tuple and extra headers as a read-only copy of the mapping passed in.
+
     Attributes:
-        subprotocols: List of supported subprotocols
-        compression: Compression algorithm to use
+        subprotocols: Supported subprotocols
+        compression: Compression algorithm to use (disabled by default for loopback servers)
         extra_headers: Additional headers for the connection
         ping_interval: Interval between ping messages
         ping_timeout: Timeout for ping responses
@@ -120,18 +170,68 @@ class WebSocketConfig:
         timeout: Connection timeout in seconds
     """
 
-    subprotocols: list[str] | None = None
+    subprotocols: Sequence[str] | None = None
     compression: str | None = None
-    extra_headers: dict[str, str] | None = None
+    extra_headers: Mapping[str, str] | None = None
     ping_interval: float | None = None
     ping_timeout: float | None = None
     max_size: int = global_config.WS_MAX_MESSAGE_SIZE
     max_queue: int = global_config.WS_MAX_QUEUE_SIZE
     timeout: float | None = None
+    # Keyword arguments for ``websockets.connect()``, computed once per configuration
+    connect_kwargs: dict[str, Any] = field(init=False, repr=False, compare=False)
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Frozen dataclasses only allow assignment through object.__setattr__
+        if self.subprotocols is not None:
+            object.__setattr__(self, "subprotocols", tuple(self.subprotocols))
+        if self.extra_headers is not None:
+            object.__setattr__(self, "extra_headers", MappingProxyType(dict(self.extra_headers)))
+
+        kwargs: dict[str, Any] = {"max_size": self.max_size, "max_queue": self.max_queue}
+        if self.subprotocols:
+            kwargs["subprotocols"] = self.subprotocols
+        if self.compression:
+            kwargs["compression"] = self.compression
+        if self.extra_headers:
+            kwargs["additional_headers"] = self.extra_headers
+        if self.ping_interval:
+            kwargs["ping_interval"] = self.ping_interval
+        if self.ping_timeout:
+            kwargs["ping_timeout"] = self.ping_timeout
+        if self.timeout:
+            kwargs["open_timeout"] = self.timeout
+        object.__setattr__(self, "connect_kwargs", kwargs)
+
+        headers = frozenset(self.extra_headers.items()) if self.extra_headers is not None else None
+        object.__setattr__(
+            self,
+            "_hash",
+            hash(
+                (
+                    self.subprotocols,
+                    self.compression,
+                    headers,
+                    self.ping_interval,
+                    self.ping_timeout,
+                    self.max_size,
+                    self.max_queue,
+                    self.timeout,
+                )
+            ),
+        )
+
+    def __hash__(self) -> int:
+        return self._hash
 
 
 class PortGenerator:
-    """Manages port allocation for test servers using configuration from global settings."""
+    """Manages port allocation for test servers using configuration from global settings.
+
+    Free ports are kept in a list shuffled once up front, so allocating a port pops from its tail
+    instead of rebuilding and sampling the whole range on every call.
+    """
 
     def __init__(self, start: int | None = None, end: int | None = None):
         if start is None:
@@ -141,13 +241,15 @@ class PortGenerator:
         self.start = start
         self.end = end
         self.used_ports: set[int] = set()
+        self._free = list(range(start, end + 1))
+        random.shuffle(self._free)
+        self._free_set = set(self._free)
 
     @staticmethod
     def is_port_available(port: int) -> bool:
-        import socket
-        from contextlib import closing
-
         with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
+            # Match uvicorn's socket options so ports lingering in TIME_WAIT count as available
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             try:
                 sock.bind(("localhost", port))
                 return True
@@ -156,81 +258,240 @@ class PortGenerator:
 
     def get_port(self) -> int:
         """Get an available port from the pool."""
-        available_ports = set(range(self.start, self.end + 1)) - self.used_ports
-        if not available_ports:
-            raise RuntimeError(f"No available ports in range {self.start}-{self.end}")
+        return self._allocate(lambda port: port if self.is_port_available(port) else None)
 
-        import random
+    def get_socket(self, host: str = "127.0.0.1") -> socket.socket:
+        """Bind a socket to an available port from the pool and keep it open.
 
-        while available_ports:
-            port = random.choice(list(available_ports))
-            if self.is_port_available(port):
-                self.used_ports.add(port)
-                return port
-            available_ports.remove(port)
+        Unlike ``get_port()``, the port cannot be taken by another process before the server
+        starts, because the returned socket already listens on it. Read the port back with
+        ``sock.getsockname()[1]`` and release it with ``release_port()`` once the socket is closed.
+        """
+        return self._allocate(lambda port: self._bind_socket(host, port))
+
+    @staticmethod
+    def _bind_socket(host: str, port: int) -> socket.socket | None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+            # A bound but not listening SO_REUSEADDR socket can still be bound again by others
+            sock.listen()
+        except (OSError, OverflowError):
+            sock.close()
+            return None
+        return sock
+
+    def _allocate(self, claim: Callable[[int], _T | None]) -> _T:
+        busy_ports = []
+        try:
+            while self._free:
+                port = self._free.pop()
+                self._free_set.discard(port)
+                if port in self.used_ports:
+                    # Claimed without going through the pool; release_port() returns it
+                    continue
+                claimed = claim(port)
+                if claimed is not None:
+                    self.used_ports.add(port)
+                    return claimed
+                busy_ports.append(port)
+        finally:
+            # Ports bound by other processes may free up later, so retry them after the untried ones
+            self._free[:0] = busy_ports
+            self._free_set.update(busy_ports)
+
+        if not busy_ports:
+            raise RuntimeError(f"No available ports in range {self.start}-{self.end}")
         raise RuntimeError(f"No available ports found in range {self.start}-{self.end}")
 
     def release_port(self, port: int) -> None:
         """Release a port back to the pool."""
         self.used_ports.discard(port)
+        if self.start <= port <= self.end and port not in self._free_set:
+            self._free.append(port)
+            self._free_set.add(port)
 
 
-class AsyncTestResponse:
+class AsyncTestResponse(ABC):
     """Enhanced response wrapper supporting both HTTP and WebSocket responses.
 
     Provides unified interface for handling both HTTP and WebSocket responses
-    with proper type checking and error handling.
+    with proper type checking and error handling. Constructing an ``AsyncTestResponse``
+    returns the HTTP or WebSocket specialization, so methods dispatch without re-checking
+    the response type on every call.
     """
 
+    def __new__(cls, response: httpx.Response | ClientConnection) -> AsyncTestResponse:
+        if cls is AsyncTestResponse:
+            import httpx
+            from websockets.asyncio.client import ClientConnection
+
+            if isinstance(response, httpx.Response):
+                cls = _HttpResponse
+            elif isinstance(response, ClientConnection):
+                cls = _WebSocketResponse
+            else:
+                raise TypeError(f"Unsupported response type: {type(response).__name__}")
+        return super().__new__(cls)
+
     def __init__(self, response: httpx.Response | ClientConnection):
         self._response = response
-        self._is_websocket = isinstance(response, ClientConnection)
 
-    async def json(self) -> Any:
+    @abstractmethod
+    async def json(self, await_in_thread: bool = False) -> Any:
         """Get JSON response (HTTP only)."""
-        if self._is_websocket:
-            raise InvalidResponseTypeError(
-                "Cannot get JSON directly from WebSocket response. Use websocket() methods instead."
-            )
-        return await asyncio.to_thread(self._response.json)
 
-    async def text(self) -> str:
+    @abstractmethod
+    async def text(self, await_in_thread: bool = False) -> str:
         """Get text response (HTTP only)."""
-        if self._is_websocket:
-            raise InvalidResponseTypeError(
-                "Cannot get text directly from WebSocket response. Use websocket() methods instead."
-            )
-        return await asyncio.to_thread(lambda: self._response.text)
 
     @property
+    @abstractmethod
     def status_code(self) -> int:
         """Get status code (HTTP only)."""
-        if self._is_websocket:
-            raise InvalidResponseTypeError("WebSocket connections don't have status codes")
-        return self._response.status_code
 
     @property
+    @abstractmethod
     def headers(self) -> httpx.Headers:
         """Get response headers (HTTP only)."""
-        if self._is_websocket:
-            raise InvalidResponseTypeError("WebSocket connections don't have headers")
-        return self._response.headers
 
+    @abstractmethod
     def websocket(self) -> ClientConnection:
         """Get WebSocket connection (WebSocket only)."""
-        if not self._is_websocket:
-            raise InvalidResponseTypeError("This response is not a WebSocket connection")
-        return self._response
 
-    async def expect_status(self, status_code: int) -> "AsyncTestResponse":
-        """Assert expected status code (HTTP only)."""
-        if self._is_websocket:
-            raise InvalidResponseTypeError("WebSocket connections don't have status codes")
+    @abstractmethod
+    async def expect_status(self, status_code: int) -> AsyncTestResponse:
+        """Assert expected status code (HTTP only).
+
+        Fails with a message naming both the expected and the actual code. A plain
+        ``response.status_code == ...`` check does the same without an await.
+        """
+
+    @abstractmethod
+    async def __aenter__(self) -> AsyncTestResponse:
+        """Use the connection as a context manager that closes it on exit (WebSocket only)."""
+
+    @abstractmethod
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        """Close the connection (WebSocket only)."""
+
+
+class _HttpResponse(AsyncTestResponse):
+    """HTTP specialization of ``AsyncTestResponse``."""
+
+    _response: httpx.Response
+
+    async def json(self, await_in_thread: bool = False) -> Any:
+        """Get JSON response.
+
+        The body is already buffered, so it is decoded inline. Pass ``await_in_thread=True``
+        to decode large payloads in a worker thread instead.
+        """
+        if await_in_thread:
+            return await asyncio.to_thread(self._response.json)
+        return self._response.json()
+
+    async def text(self, await_in_thread: bool = False) -> str:
+        """Get text response.
+
+        The body is already buffered, so it is decoded inline. Pass ``await_in_thread=True``
+        to decode large payloads in a worker thread instead.
+        """
+        if await_in_thread:
+            return await asyncio.to_thread(lambda: self._response.text)
+        return self._response.text
+
+    @property
+    def status_code(self) -> int:
+        """Get status code."""
+        return self._response.status_code
+
+    @property
+    def headers(self) -> httpx.Headers:
+        """Get response headers."""
+        return self._response.headers
+
+    def websocket(self) -> ClientConnection:
+        """Not supported for HTTP responses."""
+        raise InvalidResponseTypeError("This response is not a WebSocket connection")
+
+    async def expect_status(self, status_code: int) -> AsyncTestResponse:
+        """Assert expected status code."""
         assert self._response.status_code == status_code, (
             f"Expected status {status_code}, got {self._response.status_code}"
         )
         return self
 
+    async def __aenter__(self) -> AsyncTestResponse:
+        """Not supported for HTTP responses."""
+        raise InvalidResponseTypeError("This response is not a WebSocket connection")
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        """Not supported for HTTP responses."""
+        raise InvalidResponseTypeError("This response is not a WebSocket connection")
+
+
+class _WebSocketResponse(AsyncTestResponse):
+    """WebSocket specialization of ``AsyncTestResponse``."""
+
+    _response: ClientConnection
+
+    def __init__(self, response: ClientConnection):
+        super().__init__(response)
+        self._batch: _WebSocketBatch | None = None
+        # Set for connections opened with ``reuse=True``, so they can be parked when released
+        self._pool_key: tuple[str, WebSocketConfig | None, str] | None = None
+        # Set once the response is handed back, so a stale handle cannot park a connection in use
+        self._released = False
+        # The client that opened the connection, which drops its bookkeeping on close
+        self._client: AsyncTestClient | None = None
+
+    async def json(self, await_in_thread: bool = False) -> Any:
+        """Not supported for WebSocket responses."""
+        raise InvalidResponseTypeError(
+            "Cannot get JSON directly from WebSocket response. Use websocket() methods instead."
+        )
+
+    async def text(self, await_in_thread: bool = False) -> str:
+        """Not supported for WebSocket responses."""
+        raise InvalidResponseTypeError(
+            "Cannot get text directly from WebSocket response. Use websocket() methods instead."
+        )
+
+    @property
+    def status_code(self) -> int:
+        """Not supported for WebSocket responses."""
+        raise InvalidResponseTypeError("WebSocket connections don't have status codes")
+
+    @property
+    def headers(self) -> httpx.Headers:
+        """Not supported for WebSocket responses."""
+        raise InvalidResponseTypeError("WebSocket connections don't have headers")
+
+    async def __aenter__(self) -> AsyncTestResponse:
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        """Hand a ``reuse=True`` connection back to its client, otherwise flush and close it."""
+        if self._client is not None:
+            if self._pool_key is not None:
+                await self._client.release_websocket(self)
+            else:
+                await self._client.close_websocket(self)
+            return
+        if self._batch is not None:
+            await self._batch.close()
+        await self._response.close()
+
+    def websocket(self) -> ClientConnection:
+        """Get WebSocket connection."""
+        return self._response
+
+    async def expect_status(self, status_code: int) -> AsyncTestResponse:
+        """Not supported for WebSocket responses."""
+        raise InvalidResponseTypeError("WebSocket connections don't have status codes")
+
 
 class WebSocketHelper:
     """Helper methods for WebSocket operations."""
@@ -239,7 +500,7 @@ class WebSocketHelper:
     async def send_json(resp: AsyncTestResponse, data: Any) -> None:
         """Send JSON data over WebSocket."""
         ws = resp.websocket()
-        await ws.send(json.dumps(data))
+        await ws.send(_json_dumps(data))
 
     @staticmethod
     async def receive_json(resp: AsyncTestResponse) -> Any:
@@ -248,7 +509,26 @@ class WebSocketHelper:
         data = await ws.recv()
         if not isinstance(data, str):
             raise TypeError(f"Expected text data to decode JSON, got {type(data)}")
-        return json.loads(data)
+        return _json_loads(data)
+
+    @staticmethod
+    async def send_msgpack(resp: AsyncTestResponse, data: Any) -> None:
+        """Send data packed with msgpack as a binary frame (requires the ``msgpack`` extra)."""
+        import msgpack
+
+        ws = resp.websocket()
+        await ws.send(msgpack.packb(data))
+
+    @staticmethod
+    async def receive_msgpack(resp: AsyncTestResponse) -> Any:
+        """Receive a binary frame and unpack it with msgpack (requires the ``msgpack`` extra)."""
+        import msgpack
+
+        ws = resp.websocket()
+        data = await ws.recv()
+        if not isinstance(data, bytes):
+            raise TypeError(f"Expected binary data to unpack msgpack, got {type(data)}")
+        return msgpack.unpackb(data)
 
     @staticmethod
     async def send_binary(resp: AsyncTestResponse, data: bytes) -> None:
@@ -287,7 +567,9 @@ class WebSocketHelper:
         """Assert expected message is received within timeout."""
         ws = resp.websocket()
         try:
-            message = await asyncio.wait_for(ws.recv(), timeout)
+            # asyncio.timeout awaits recv() in the current task instead of wrapping it in a new one
+            async with asyncio.timeout(timeout):
+                message = await ws.recv()
         except TimeoutError as e:
             logger.error("Timed out waiting for message")
             raise e
@@ -295,120 +577,402 @@ class WebSocketHelper:
         if isinstance(expected, dict):
             if not isinstance(message, str):
                 raise AssertionError(f"Expected a text message for JSON decoding, got {type(message)}")
-            if json.loads(message) != expected:
+            if _json_loads(message) != expected:
                 raise AssertionError(f"Expected message {expected}, got {message}")
         else:
             if message != expected:
                 raise AssertionError(f"Expected message {expected}, got {message}")
 
     @staticmethod
-    async def drain_messages(resp: AsyncTestResponse, timeout: float | None = 0.1) -> list[Any]:
-        """Drain all pending messages from websocket queue."""
+    async def drain_messages(
+        resp: AsyncTestResponse, timeout: float | None = 0.1, max_messages: int | None = None
+    ) -> list[Any]:
+        """Drain all pending messages from websocket queue.
+
+        Stops once no message has arrived for ``timeout`` seconds, or once ``max_messages``
+        messages have been collected, so a runaway endpoint cannot grow the result without bound.
+        Messages beyond the cap stay queued on the connection. A single timeout scope is pushed
+        back rather than wrapping every receive in ``wait_for``, and only before a receive that
+        has to wait: complete messages already buffered by the connection are read back to back.
+        """
         ws = resp.websocket()
+        # Frames buffered by the connection. This is websockets' internal state, so when it is not
+        # available every receive is treated as one that may wait.
+        buffered = getattr(getattr(getattr(ws, "recv_messages", None), "frames", None), "queue", None)
         messages = []
+        loop = asyncio.get_running_loop()
         try:
-            while True:
-                message = await asyncio.wait_for(ws.recv(), timeout)
-                messages.append(message)
+            async with asyncio.timeout(timeout) as idle_timeout:
+                while max_messages is None or len(messages) < max_messages:
+                    # A buffer ending in a non-final fragment may hold no complete message yet
+                    if timeout is not None and not (buffered and buffered[-1].fin):
+                        idle_timeout.reschedule(loop.time() + timeout)
+                    messages.append(await ws.recv())
         except TimeoutError:
             pass
         return messages
 
 
+class _WebSocketBatch:
+    """Buffer of pending messages for a WebSocket connection opened with ``batch=True``.
+
+    Messages are framed with a little-endian 4-byte length prefix and coalesced into a single
+    binary frame, flushed when the batch is full, when it would exceed the configured maximum
+    message size, or after the flush interval elapses.
+    """
+
+    def __init__(
+        self,
+        ws: ClientConnection,
+        flush_interval_ms: float = DEFAULT_WS_FLUSH_INTERVAL_MS,
+        max_messages: int = DEFAULT_WS_BATCH_SIZE,
+        max_size: int | None = None,
+    ):
+        self.ws = ws
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_messages = max_messages
+        self.max_size = max_size if max_size is not None else global_config.WS_MAX_MESSAGE_SIZE
+        self._pending: deque[bytes] = deque()
+        self._pending_size = 0
+        self._lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+
+    async def feed(self, payload: bytes) -> None:
+        """Queue a message, flushing immediately once a size threshold is reached."""
+        framed_size = _BATCH_LENGTH_PREFIX.size + len(payload)
+        if framed_size > self.max_size:
+            raise ValueError(f"Message of {len(payload)} bytes exceeds the batch frame limit of {self.max_size} bytes")
+
+        self._pending.append(payload)
+        self._pending_size += framed_size
+
+        if len(self._pending) >= self.max_messages or self._pending_size >= self.max_size:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        """Send all pending messages, using as few frames as the size limits allow."""
+        async with self._lock:
+            while self._pending:
+                frame = bytearray()
+                count = 0
+                while self._pending and count < self.max_messages:
+                    framed_size = _BATCH_LENGTH_PREFIX.size + len(self._pending[0])
+                    if frame and len(frame) + framed_size > self.max_size:
+                        break
+                    payload = self._pending.popleft()
+                    self._pending_size -= framed_size
+                    frame += _BATCH_LENGTH_PREFIX.pack(len(payload))
+                    frame += payload
+                    count += 1
+                await self.ws.send(bytes(frame))
+
+    async def _flush_later(self) -> None:
+        from websockets.exceptions import ConnectionClosed
+
+        try:
+            await asyncio.sleep(self.flush_interval)
+            self._flush_task = None
+            await self.flush()
+        except ConnectionClosed as e:
+            logger.warning(f"Error flushing batched WebSocket messages: {e}")
+
+    async def close(self) -> None:
+        """Cancel the pending flush timer and send whatever is still buffered."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        from websockets.protocol import State
+
+        if self.ws.state == State.OPEN:
+            await self.flush()
+
+
+def _get_batch(resp: AsyncTestResponse) -> _WebSocketBatch:
+    resp.websocket()
+    batch = getattr(resp, "_batch", None)
+    if batch is None:
+        raise InvalidResponseTypeError("WebSocket connection was not opened with batch=True")
+    return batch
+
+
+class BatchingWebSocketHelper(WebSocketHelper):
+    """WebSocket helper that coalesces small messages into length-prefixed batch frames.
+
+    Each fed message is framed as ``struct.pack("<I", len(payload)) + payload`` and buffered
+    until ``flush()`` is called, the batch is full, or the flush interval elapses. The receiving
+    endpoint decodes a batch frame with ``unpack_batch()``.
+    """
+
+    @staticmethod
+    async def feed_json(resp: AsyncTestResponse, data: Any) -> None:
+        """Queue JSON data for the next batch frame."""
+        await _get_batch(resp).feed(_json_dumps_bytes(data))
+
+    @staticmethod
+    async def feed_text(resp: AsyncTestResponse, data: str) -> None:
+        """Queue text data for the next batch frame."""
+        await _get_batch(resp).feed(data.encode())
+
+    @staticmethod
+    async def feed_binary(resp: AsyncTestResponse, data: bytes) -> None:
+        """Queue binary data for the next batch frame."""
+        await _get_batch(resp).feed(data)
+
+    @staticmethod
+    async def flush(resp: AsyncTestResponse) -> None:
+        """Send all queued messages now."""
+        await _get_batch(resp).flush()
+
+    @staticmethod
+    def unpack_batch(data: bytes) -> list[bytes]:
+        """Split a batch frame back into its individual message payloads."""
+        messages = []
+        offset = 0
+        while offset < len(data):
+            (length,) = _BATCH_LENGTH_PREFIX.unpack_from(data, offset)
+            offset += _BATCH_LENGTH_PREFIX.size
+            messages.append(data[offset : offset + length])
+            offset += length
+        return messages
+
+
+@functools.cache
+def _ssl_context() -> ssl.SSLContext:
+    """SSL context shared by all clients, since loading the CA bundle dominates client construction."""
+    import httpx
+
+    return httpx.create_ssl_context()
+
+
 class AsyncTestClient:
-    """Async test client supporting both HTTP and WebSocket connections."""
+    """Async test client supporting both HTTP and WebSocket connections.
+
+    HTTP/2 is off by default: test servers are reached over plain-text loopback, where HTTP/1.1
+    keep-alive is the fast path and HTTP/2 only adds setup cost.
 
-    def __init__(self, base_url: str, timeout: float = 30.0, follow_redirects: bool = True):
+    An existing ``httpx.AsyncClient`` can be passed as ``http_client`` to share one connection pool
+    between several test clients. Its own timeout, redirect and HTTP/2 settings then apply, and it
+    is left open when this client closes.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 30.0,
+        follow_redirects: bool = True,
+        http2: bool = False,
+        http_client: httpx.AsyncClient | None = None,
+    ):
         self._base_url = base_url.rstrip("/")
         self._timeout = timeout
         self._websocket_connections: set[ClientConnection] = set()
+        self._websocket_batches: dict[ClientConnection, _WebSocketBatch] = {}
+        self._idle_websockets: dict[tuple[str, WebSocketConfig | None, str], list[ClientConnection]] = {}
+        # The pool key each connection in _idle_websockets is parked under, so releasing one twice
+        # does not park it twice and closing one finds its pool without the original handle
+        self._idle_connections: dict[ClientConnection, tuple[str, WebSocketConfig | None, str]] = {}
 
-        limits = httpx.Limits(
-            max_keepalive_connections=global_config.HTTP_MAX_KEEPALIVE,
-            max_connections=global_config.HTTP_MAX_CONNECTIONS,
-        )
-        self._client = httpx.AsyncClient(
-            base_url=self._base_url, timeout=timeout, follow_redirects=follow_redirects, limits=limits, http2=True
-        )
+        # Resolved once so opening a websocket only has to append the path
+        if self._base_url.startswith("https://"):
+            self._ws_base_url: str | None = "wss://" + self._base_url[8:]
+        elif self._base_url.startswith("http://"):
+            self._ws_base_url = "ws://" + self._base_url[7:]
+        else:
+            self._ws_base_url = None
+        default_ws_kwargs: dict[str, Any] = {
+            "open_timeout": timeout,
+            "max_size": global_config.WS_MAX_MESSAGE_SIZE,
+            "max_queue": global_config.WS_MAX_QUEUE_SIZE,
+        }
+        # permessage-deflate costs CPU on every frame and saves nothing on loopback, so it is
+        # disabled there unless WebSocketConfig.compression asks for it
+        if urlsplit(self._base_url).hostname in _LOOPBACK_HOSTS:
+            default_ws_kwargs["compression"] = None
+        self._default_ws_kwargs: Mapping[str, Any] = MappingProxyType(default_ws_kwargs)
+
+        self._owns_http_client = http_client is None
+        if http_client is not None:
+            # A shared client has no base URL of its own, so relative paths are resolved here
+            self._client = http_client
+            self._url_prefix = self._base_url
+        else:
+            import httpx
+
+            limits = httpx.Limits(
+                max_keepalive_connections=global_config.HTTP_MAX_KEEPALIVE,
+                max_connections=global_config.HTTP_MAX_CONNECTIONS,
+            )
+            self._client = httpx.AsyncClient(
+                base_url=self._base_url,
+                timeout=timeout,
+                follow_redirects=follow_redirects,
+                limits=limits,
+                http2=http2,
+                verify=_ssl_context(),
+            )
+            self._url_prefix = ""
 
-        self.ws = WebSocketHelper()
+        # The helpers are static, so every client shares the class rather than allocating an instance
+        self.ws: type[BatchingWebSocketHelper] = BatchingWebSocketHelper
 
     async def close(self) -> None:
         """Close all connections and cleanup resources."""
-        # Clean up any active websocket connections
-        for ws in list(self._websocket_connections):
+        from websockets.protocol import State
+
+        # Send any batched messages still buffered before closing their connections
+        for batch in self._websocket_batches.values():
             try:
-                if ws.state == State.CLOSED:
-                    self._websocket_connections.discard(ws)
-                else:
-                    await ws.close()
-                    self._websocket_connections.discard(ws)
+                await batch.close()
             except Exception as e:
-                logger.warning(f"Error closing websocket connection: {e}")
-        self._websocket_connections.clear()
+                logger.warning(f"Error flushing batched websocket messages: {e}")
+        self._websocket_batches.clear()
+        self._idle_websockets.clear()
+        self._idle_connections.clear()
+
+        # Close any active websocket connections concurrently
+        connections = self._websocket_connections
+        self._websocket_connections = set()
+        results = await asyncio.gather(
+            *(ws.close() for ws in connections if ws.state != State.CLOSED), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Error closing websocket connection: {result}")
 
-        if self._client:
+        if self._client and self._owns_http_client:
             await self._client.aclose()
 
     async def request(self, method: str, url: str, **kwargs: Any) -> AsyncTestResponse:
         """Make HTTP request."""
+        if self._url_prefix and not urlsplit(url).scheme:
+            # Joined the way httpx merges a relative URL onto base_url
+            url = f"{self._url_prefix}/{url.lstrip('/')}"
         response = await self._client.request(method, url, **kwargs)
-        return AsyncTestResponse(response)
+        return _HttpResponse(response)
 
     async def websocket(
-        self, path: str, config: WebSocketConfig | None = None, options: dict[str, Any] | None = None
+        self,
+        path: str,
+        config: WebSocketConfig | None = None,
+        options: dict[str, Any] | None = None,
+        batch: bool = False,
+        flush_interval_ms: float = DEFAULT_WS_FLUSH_INTERVAL_MS,
+        reuse: bool = False,
     ) -> AsyncTestResponse:
-        """Create a websocket connection with configuration."""
-        if not (self._base_url.startswith("http://") or self._base_url.startswith("https://")):
-            raise ValueError("Invalid base URL. Must start with 'http://' or 'https://'")
-        if self._base_url.startswith("https://"):
-            ws_url = f"wss://{self._base_url.replace('https://', '')}{path}"
-        elif self._base_url.startswith("http://"):
-            ws_url = f"ws://{self._base_url.replace('http://', '')}{path}"
-        else:
-            ws_url = f"ws://{self._base_url}{path}"
+        """Create a websocket connection with configuration.
 
-        connect_kwargs: dict[str, Any] = {
-            "open_timeout": self._timeout,
-            "max_size": global_config.WS_MAX_MESSAGE_SIZE,
-            "max_queue": global_config.WS_MAX_QUEUE_SIZE,
-        }
+        With ``batch=True`` the ``client.ws.feed_*`` helpers coalesce messages into
+        length-prefixed batch frames, flushed at most ``flush_interval_ms`` after the first
+        queued message.
 
-        if config:
-            if config.subprotocols:
-                connect_kwargs["subprotocols"] = config.subprotocols
-            if config.compression:
-                connect_kwargs["compression"] = config.compression
-            if config.extra_headers:
-                connect_kwargs["additional_headers"] = config.extra_headers
-            if config.ping_interval:
-                connect_kwargs["ping_interval"] = config.ping_interval
-            if config.ping_timeout:
-                connect_kwargs["ping_timeout"] = config.ping_timeout
-            if config.timeout:
-                connect_kwargs["open_timeout"] = config.timeout
+        With ``reuse=True`` an idle connection handed back through ``release_websocket()`` for
+        the same path and connection options is returned instead of opening a new one, which
+        skips the TCP and upgrade handshakes. The endpoint keeps serving the same connection,
+        so this only suits endpoints without per-connection state, such as echo handlers.
+        """
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import InvalidHandshake, InvalidMessage, InvalidURI
+        from websockets.protocol import State
+
+        if batch and reuse:
+            raise ValueError("Batched websocket connections cannot be reused")
 
+        if self._ws_base_url is None:
+            raise ValueError("Invalid base URL. Must start with 'http://' or 'https://'")
+        ws_url = self._ws_base_url + path
+
+        connect_kwargs = {**self._default_ws_kwargs}
+        if config:
+            connect_kwargs.update(config.connect_kwargs)
         if options:
             connect_kwargs.update(options)
 
+        pool_key = None
+        if reuse:
+            # The client's defaults are fixed, so path, config and options determine connect_kwargs
+            pool_key = (path, config, repr(options))
+            idle = self._idle_websockets.get(pool_key)
+            while idle:
+                ws = idle.pop()
+                del self._idle_connections[ws]
+                if ws.state is State.OPEN:
+                    response = _WebSocketResponse(ws)
+                    response._pool_key = pool_key
+                    response._client = self
+                    return response
+                self._websocket_connections.discard(ws)
+
         # Retry logic for establishing a WebSocket connection.
+        retry_attempts = global_config.WS_RETRY_ATTEMPTS
+        retry_delay = global_config.WS_RETRY_DELAY
         attempt = 0
         while True:
             try:
                 ws = await connect(ws_url, **connect_kwargs)
                 break
             except Exception as e:
-                attempt += 1
-                if attempt >= global_config.WS_RETRY_ATTEMPTS:
-                    logger.error(
-                        f"Failed to establish WebSocket connection after "
-                        f"{global_config.WS_RETRY_ATTEMPTS} attempts: {e}"
-                    )
+                # A server that answered (or a malformed URL) would fail the same way again, but a
+                # half-started server can cut the handshake short, which surfaces as InvalidMessage
+                if isinstance(e, (InvalidHandshake, InvalidURI)) and not isinstance(e, InvalidMessage):
+                    raise
+                if attempt + 1 >= retry_attempts:
+                    logger.error(f"Failed to establish WebSocket connection after {retry_attempts} attempts: {e}")
                     raise
-                await asyncio.sleep(global_config.WS_RETRY_DELAY)
+                # Exponential backoff with jitter so slow startups recover quickly without hammering
+                await asyncio.sleep(min(retry_delay * 2**attempt, _WS_MAX_RETRY_DELAY) * random.uniform(0.5, 1.5))
+                attempt += 1
 
         self._websocket_connections.add(ws)
-        return AsyncTestResponse(ws)
+        response = _WebSocketResponse(ws)
+        response._pool_key = pool_key
+        response._client = self
+        if batch:
+            response._batch = _WebSocketBatch(
+                ws, flush_interval_ms=flush_interval_ms, max_size=connect_kwargs["max_size"]
+            )
+            self._websocket_batches[ws] = response._batch
+        return response
+
+    async def release_websocket(self, response: AsyncTestResponse) -> None:
+        """Hand back a websocket connection once a test is done with it.
+
+        Connections opened with ``reuse=True`` that are still open are parked for the next
+        ``websocket(..., reuse=True)`` call with the same path and options; any other connection
+        is closed. Messages left unread on a parked connection are seen by its next user.
+        Each response is released once: releasing it again, or releasing a connection that is
+        already parked, does nothing.
+        """
+        from websockets.protocol import State
+
+        ws = response.websocket()
+        if getattr(response, "_released", False) or ws in self._idle_connections:
+            return
+        response._released = True
+        pool_key = getattr(response, "_pool_key", None)
+        if pool_key is not None and ws.state is State.OPEN:
+            self._idle_websockets.setdefault(pool_key, []).append(ws)
+            self._idle_connections[ws] = pool_key
+            return
+        await self.close_websocket(response)
+
+    async def close_websocket(self, response: AsyncTestResponse) -> None:
+        """Close a websocket connection opened by this client and stop tracking it.
+
+        Any batched messages still buffered are sent first. Leaving an ``async with`` block on a
+        websocket response calls this.
+        """
+        ws = response.websocket()
+        self._websocket_connections.discard(ws)
+        pool_key = self._idle_connections.pop(ws, None)
+        if pool_key is not None:
+            self._idle_websockets[pool_key].remove(ws)
+        batch = self._websocket_batches.pop(ws, None)
+        if batch is not None:
+            await batch.close()
+        await ws.close()
 
     async def get(self, url: str, **kwargs: Any) -> AsyncTestResponse:
         return await self.request("GET", url, **kwargs)
@@ -425,24 +989,128 @@ class AsyncTestClient:
     async def patch(self, url: str, **kwargs: Any) -> AsyncTestResponse:
         return await self.request("PATCH", url, **kwargs)
 
-    async def __aenter__(self) -> "AsyncTestClient":
+    async def __aenter__(self) -> AsyncTestClient:
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
         await self.close()
 
 
-class UvicornTestServer(uvicorn.Server):
-    """Uvicorn test server with startup event support."""
+class _NotifyingSet(set):
+    """Set that sets an event whenever an item is removed, so emptying it can be awaited."""
+
+    def __init__(self, removed: asyncio.Event):
+        super().__init__()
+        self._removed = removed
+
+    def discard(self, item: Any) -> None:
+        super().discard(item)
+        self._removed.set()
+
+    def remove(self, item: Any) -> None:
+        super().remove(item)
+        self._removed.set()
 
-    def __init__(self, config: uvicorn.Config, startup_handler: asyncio.Event):
-        super().__init__(config)
-        self.startup_handler = startup_handler
 
-    async def startup(self, sockets: list | None = None) -> None:
-        """Override startup to signal when ready."""
-        await super().startup(sockets=sockets)
-        self.startup_handler.set()
+@functools.cache
+def _uvicorn_test_server_class() -> type[uvicorn.Server]:
+    import uvicorn
+
+    class UvicornTestServer(uvicorn.Server):
+        """Uvicorn test server with startup event support.
+
+        Runs inside the test's event loop, so it leaves signal handling to the test runner and
+        reacts to ``should_exit`` being set at once instead of on uvicorn's 0.1s polling ticks.
+        """
+
+        def __init__(self, config: uvicorn.Config, startup_handler: asyncio.Event):
+            # Created first, because uvicorn.Server.__init__ assigns should_exit
+            self._exit_requested = asyncio.Event()
+            super().__init__(config)
+            self.startup_handler = startup_handler
+            # Protocols keep references to these sets, so they are swapped before any connection
+            self._state_removed = asyncio.Event()
+            self.server_state.connections = _NotifyingSet(self._state_removed)
+            self.server_state.tasks = _NotifyingSet(self._state_removed)
+
+        @property
+        def should_exit(self) -> bool:
+            return self._exit_requested.is_set()
+
+        @should_exit.setter
+        def should_exit(self, value: bool) -> None:
+            # Setting the flag from anywhere wakes the main loop at once
+            if value:
+                self._exit_requested.set()
+            else:
+                self._exit_requested.clear()
+
+        def request_exit(self) -> None:
+            """Ask the server to shut down, waking its main loop immediately."""
+            self.should_exit = True
+
+        @contextmanager
+        def capture_signals(self) -> Generator[None, None, None]:
+            """Leave SIGINT/SIGTERM to the test runner rather than swapping handlers per server."""
+            yield
+
+        async def startup(self, sockets: list | None = None) -> None:
+            """Override startup to signal when ready."""
+            await super().startup(sockets=sockets)
+            self.startup_handler.set()
+
+        async def main_loop(self) -> None:
+            """Wait for an exit request, still refreshing the default headers once per second."""
+            counter = 0
+            should_exit = await self.on_tick(counter)
+            while not should_exit:
+                with suppress(TimeoutError):
+                    async with asyncio.timeout(1.0):
+                        await self._exit_requested.wait()
+                # on_tick refreshes the Date header on every tenth tick of uvicorn's own loop
+                counter = (counter + 10) % 864000
+                should_exit = self.should_exit or await self.on_tick(counter)
+
+        async def shutdown(self, sockets: list | None = None) -> None:
+            """Shut down as uvicorn does, but wake as soon as the last connection or task finishes.
+
+            uvicorn sleeps a fixed 0.1s after asking connections to close and then polls every
+            0.1s, which dominates stopping a test server that has few or no open connections.
+            """
+            for server in self.servers:
+                server.close()
+            for sock in sockets or []:
+                sock.close()
+
+            state = self.server_state
+            for connection in list(state.connections):
+                connection.shutdown()
+
+            try:
+                async with asyncio.timeout(self.config.timeout_graceful_shutdown):
+                    while (state.connections or state.tasks) and not self.force_exit:
+                        self._state_removed.clear()
+                        await self._state_removed.wait()
+                    for server in self.servers:
+                        await server.wait_closed()
+            except TimeoutError:
+                logger.error(f"Cancel {len(state.tasks)} running task(s), timeout graceful shutdown exceeded")
+                for task in state.tasks:
+                    task.cancel(msg="Task cancelled, timeout graceful shutdown exceeded")
+
+            if not self.force_exit:
+                await self.lifespan.shutdown()
+
+    UvicornTestServer.__module__ = __name__
+    UvicornTestServer.__qualname__ = "UvicornTestServer"
+    return UvicornTestServer
+
+
+def __getattr__(name: str) -> Any:
+    # UvicornTestServer subclasses uvicorn.Server, so it is created on first access (PEP 562)
+    if name == "UvicornTestServer":
+        return _uvicorn_test_server_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Use the configurable PortGenerator instance
@@ -457,78 +1125,96 @@ class AsyncTestServer:
         lifespan: Lifespan[AppType] | None = None,
         startup_timeout: float = 30.0,
         shutdown_timeout: float = 10.0,
+        http_client: httpx.AsyncClient | None = None,
     ):
+        from fastapi import FastAPI
+
         self.app = FastAPI(lifespan=lifespan)
         self.startup_timeout = startup_timeout
         self.shutdown_timeout = shutdown_timeout
+        self._http_client = http_client
         self._startup_complete = asyncio.Event()
         self._shutdown_complete = asyncio.Event()
         self._server_task: asyncio.Task | None = None
         self._port: int | None = None
+        self._socket: socket.socket | None = None
         self._host = "127.0.0.1"
         self._client: AsyncTestClient | None = None
-        self._server: UvicornTestServer | None = None
-        self._websocket_tasks: set[asyncio.Task] = set()
+        self._server: uvicorn.Server | None = None
 
     async def start(self) -> None:
         """Start the server asynchronously with proper lifecycle management."""
+        import uvicorn
+
         if self._server_task is not None:
             raise RuntimeError("Server is already running")
 
-        self._port = _port_generator.get_port()
+        # Hand uvicorn the already bound socket so no other process can claim the port in between
+        self._socket = _port_generator.get_socket(self._host)
+        self._port = self._socket.getsockname()[1]
         startup_handler = asyncio.Event()
 
-        config = uvicorn.Config(app=self.app, host=self._host, port=self._port, log_level="error", loop="asyncio")
+        # The server is awaited on the caller's event loop, so uvloop applies when the test loop uses it.
+        # FastAPI apps are always ASGI3, which saves uvicorn from inspecting the app at startup.
+        config = uvicorn.Config(
+            app=self.app, host=self._host, port=self._port, log_level="error", loop="auto", interface="asgi3"
+        )
 
-        self._server = UvicornTestServer(config=config, startup_handler=startup_handler)
+        self._server = _uvicorn_test_server_class()(config=config, startup_handler=startup_handler)
 
-        self._server_task = asyncio.create_task(self._server.serve())
+        self._server_task = asyncio.create_task(self._server.serve(sockets=[self._socket]))
+
+        # The client does not need the server to be up, so it is ready the moment startup completes
+        self._client = self._build_client()
 
         try:
             await asyncio.wait_for(startup_handler.wait(), timeout=self.startup_timeout)
 
-            self._client = AsyncTestClient(base_url=self.base_url, timeout=self.startup_timeout)
-
             self._startup_complete.set()
 
         except (TimeoutError, Exception) as e:
-            await self.stop()
+            port = self._port
+            await self._abort_start()
             if isinstance(e, asyncio.TimeoutError):
-                raise RuntimeError(f"Server startup timed out on host {self._host} and port {self._port}") from e
+                raise RuntimeError(f"Server startup timed out on host {self._host} and port {port}") from e
             raise
 
-    async def stop(self) -> None:
-        """Stop the server and clean up all resources including WebSocket connections."""
-        if not self._startup_complete.is_set():
-            return
+    def _build_client(self) -> AsyncTestClient:
+        return AsyncTestClient(base_url=self.base_url, timeout=self.startup_timeout, http_client=self._http_client)
 
-        # Cancel all WebSocket tasks
-        for task in self._websocket_tasks:
-            if not task.done():
-                task.cancel()
-        await asyncio.gather(*self._websocket_tasks, return_exceptions=True)
-        self._websocket_tasks.clear()
+    async def _abort_start(self) -> None:
+        """Release everything acquired by a start() that never completed."""
+        if self._server_task:
+            self._server_task.cancel()
+            await asyncio.gather(self._server_task, return_exceptions=True)
+            self._server_task = None
 
         if self._client:
             await self._client.close()
             self._client = None
 
-        if self._server_task:
-            try:
-                if self._server:
-                    self._server.should_exit = True
+        if self._socket:
+            self._socket.close()
+            self._socket = None
 
-                await asyncio.wait_for(self._server_task, timeout=self.shutdown_timeout)
+        if self._port:
+            _port_generator.release_port(self._port)
+            self._port = None
 
-            except TimeoutError:
-                logger.error(f"Timeout waiting for server shutdown on host {self._host} port {self._port}")
-                if not self._server_task.done():
-                    self._server_task.cancel()
-                    await asyncio.gather(self._server_task, return_exceptions=True)
-            except asyncio.CancelledError:
-                logger.info("Server task cancelled successfully")
-            finally:
-                self._server_task = None
+    async def stop(self) -> None:
+        """Stop the server and clean up all resources including WebSocket connections."""
+        if not self._startup_complete.is_set():
+            return
+
+        if self._server:
+            self._server.request_exit()
+
+        # The client and the server shut down independently, so wait for both at once
+        results = await asyncio.gather(self._close_client(), self._wait_for_server_exit(), return_exceptions=True)
+
+        if self._socket:
+            self._socket.close()
+            self._socket = None
 
         if self._port:
             _port_generator.release_port(self._port)
@@ -536,13 +1222,37 @@ class AsyncTestServer:
 
         self._shutdown_complete.set()
 
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def _close_client(self) -> None:
+        if self._client:
+            client, self._client = self._client, None
+            await client.close()
+
+    async def _wait_for_server_exit(self) -> None:
+        if not self._server_task:
+            return
+        try:
+            await asyncio.wait_for(self._server_task, timeout=self.shutdown_timeout)
+        except TimeoutError:
+            logger.error(f"Timeout waiting for server shutdown on host {self._host} port {self._port}")
+            if not self._server_task.done():
+                self._server_task.cancel()
+                await asyncio.gather(self._server_task, return_exceptions=True)
+        except asyncio.CancelledError:
+            logger.info("Server task cancelled successfully")
+        finally:
+            self._server_task = None
+
     @property
     def base_url(self) -> str:
         if not self._port:
             raise RuntimeError("Server is not running")
         return f"http://{self._host}:{self._port}"
 
-    async def __aenter__(self) -> "AsyncTestServer":
+    async def __aenter__(self) -> AsyncTestServer:
         await self.start()
         return self
 
@@ -559,9 +1269,10 @@ class AsyncTestServer:
 @asynccontextmanager
 async def create_test_server(
     lifespan: Lifespan[AppType] | None = None,
+    http_client: httpx.AsyncClient | None = None,
 ) -> AsyncGenerator[AsyncTestServer, None]:
     """Create and manage a TestServer instance with proper lifecycle"""
-    server = AsyncTestServer(lifespan=lifespan)
+    server = AsyncTestServer(lifespan=lifespan, http_client=http_client)
     try:
         await server.start()
         yield server
@@ -0,0 +1,97 @@
+import asyncio
+import os
+from collections.abc import AsyncGenerator, Awaitable, Callable, Generator
+from typing import Any
+from uuid import uuid4
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from fastapi_testing import (
+    AsyncTestResponse,
+    AsyncTestServer,
+    PortGenerator,
+    async_fastapi_testing,
+    create_test_server,
+    global_config,
+)
+
+try:
+    import uvloop
+except ImportError:  # not installed, or on Windows where uvloop is unavailable
+    uvloop = None
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption("--run-slow", action="store_true", default=False, help="run tests marked as slow")
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    if config.getoption("--run-slow"):
+        return
+    skip_slow = pytest.mark.skip(reason="needs --run-slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    # Under pytest-xdist each worker allocates server ports from its own slice of the configured range
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    if not worker:
+        return
+    index = int(worker.removeprefix("gw"))
+    count = int(os.environ["PYTEST_XDIST_WORKER_COUNT"])
+    size = (global_config.PORT_RANGE_END - global_config.PORT_RANGE_START + 1) // count
+    start = global_config.PORT_RANGE_START + index * size
+    async_fastapi_testing._port_generator = PortGenerator(start=start, end=start + size - 1)
+
+
+if uvloop is not None:
+
+    def pytest_asyncio_loop_factories(config: pytest.Config, item: pytest.Item) -> dict[str, Callable[[], Any]]:
+        # Run every async test and fixture on uvloop, which cuts the per-await overhead of the suite
+        return {"uvloop": uvloop.new_event_loop}
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def http_client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    """One pooled HTTP client for the whole session, so keep-alive connections outlive single tests."""
+    limits = httpx.Limits(max_keepalive_connections=100, max_connections=200)
+    async with httpx.AsyncClient(limits=limits, follow_redirects=True) as client:
+        yield client
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def shared_server(http_client: httpx.AsyncClient) -> AsyncGenerator[AsyncTestServer, None]:
+    """One running test server for the whole session.
+
+    Tests using it must run on the session loop (``@pytest.mark.asyncio(loop_scope="session")``)
+    and register their routes under ``route_prefix`` so they cannot collide with other tests.
+    """
+    async with create_test_server(http_client=http_client) as server:
+        yield server
+
+
+@pytest.fixture
+def route_prefix(shared_server: AsyncTestServer) -> Generator[str, None, None]:
+    """Unique path prefix for routes a test adds to the shared server, removed again afterwards."""
+    prefix = f"/t/{uuid4().hex}"
+    yield prefix
+    routes = shared_server.app.router.routes
+    routes[:] = [route for route in routes if not getattr(route, "path", "").startswith(prefix)]
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def open_ws(shared_server: AsyncTestServer) -> AsyncGenerator[Callable[..., Awaitable[AsyncTestResponse]], None]:
+    """Open WebSocket connections to the shared server, all closed concurrently after the test."""
+    opened: list[AsyncTestResponse] = []
+
+    async def connect(path: str, **kwargs) -> AsyncTestResponse:
+        response = await shared_server.client.websocket(path, **kwargs)
+        opened.append(response)
+        return response
+
+    yield connect
+    await asyncio.gather(*(shared_server.client.close_websocket(response) for response in opened))
@@ -1,8 +1,13 @@
 import os
+import socket
+import subprocess
+import sys
+from contextlib import closing
+from dataclasses import FrozenInstanceError, replace
 
 import pytest
 
-from fastapi_testing.async_fastapi_testing import Config, PortGenerator
+from fastapi_testing.async_fastapi_testing import Config, PortGenerator, WebSocketConfig
 
 
 class TestConfig:
@@ -211,3 +216,117 @@ class TestPortGenerator:
         # Should be able to get it again
         port2 = generator.get_port()
         assert port2 == 65530
+
+    def test_port_generator_retries_busy_port(self):
+        """Test that a port bound by another socket is retried once it is freed"""
+        generator = PortGenerator(start=65533, end=65533)
+
+        with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
+            sock.bind(("localhost", 65533))
+            sock.listen()
+
+            with pytest.raises(RuntimeError, match="No available ports found"):
+                generator.get_port()
+
+        assert generator.get_port() == 65533
+
+    def test_port_generator_get_socket(self):
+        """Test that get_socket keeps the allocated port bound until released"""
+        generator = PortGenerator(start=65534, end=65534)
+
+        sock = generator.get_socket()
+        try:
+            assert sock.getsockname()[1] == 65534
+
+            with pytest.raises(RuntimeError, match="No available ports in range"):
+                generator.get_socket()
+        finally:
+            sock.close()
+            generator.release_port(65534)
+
+        with closing(generator.get_socket()) as sock:
+            assert sock.getsockname()[1] == 65534
+
+    def test_port_generator_get_socket_blocks_reuseaddr_binds(self):
+        """Test that a held port cannot be bound again, even with SO_REUSEADDR"""
+        generator = PortGenerator(start=65534, end=65534)
+
+        with closing(generator.get_socket()) as sock:
+            port = sock.getsockname()[1]
+            with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as other:
+                other.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                with pytest.raises(OSError):
+                    other.bind(("127.0.0.1", port))
+            assert PortGenerator.is_port_available(port) is False
+
+
+class TestWebSocketConfig:
+    """Test cases for WebSocketConfig"""
+
+    def test_connect_kwargs(self):
+        """Test that only configured options are translated to connect() keyword arguments"""
+        config = WebSocketConfig(
+            subprotocols=["test-protocol"],
+            extra_headers={"X-Test-Header": "test-value"},
+            ping_interval=20.0,
+            timeout=5.0,
+            max_queue=16,
+        )
+        assert config.connect_kwargs == {
+            "max_size": 2**20,
+            "max_queue": 16,
+            "subprotocols": ("test-protocol",),
+            "additional_headers": {"X-Test-Header": "test-value"},
+            "ping_interval": 20.0,
+            "open_timeout": 5.0,
+        }
+        # The translation is computed once per configuration
+        assert config.connect_kwargs is config.connect_kwargs
+
+    def test_config_is_frozen(self):
+        """Test that WebSocketConfig cannot be mutated after its kwargs are cached"""
+        config = WebSocketConfig()
+        with pytest.raises(FrozenInstanceError):
+            config.timeout = 1.0  # type: ignore[misc]
+
+    def test_config_uses_slots(self):
+        """Test that WebSocketConfig has no instance dict and recomputes kwargs on replace()"""
+        config = WebSocketConfig(timeout=5.0)
+        assert not hasattr(config, "__dict__")
+        updated = replace(config, timeout=1.0)
+        assert updated.connect_kwargs["open_timeout"] == 1.0
+        assert config.connect_kwargs["open_timeout"] == 5.0
+
+    def test_config_is_hashable(self):
+        """Test that equal configurations hash alike, whatever container types they were built from"""
+        headers = {"X-Test-Header": "test-value"}
+        config = WebSocketConfig(subprotocols=["test-protocol"], extra_headers=headers)
+        same = WebSocketConfig(subprotocols=("test-protocol",), extra_headers=dict(headers))
+
+        assert config == same
+        assert hash(config) == hash(same)
+        assert {config: "pooled"}[same] == "pooled"
+        assert hash(config) != hash(WebSocketConfig(subprotocols=["other-protocol"], extra_headers=headers))
+
+        # The configuration keeps its own read-only copy of the headers
+        headers["X-Test-Header"] = "changed"
+        assert config.extra_headers["X-Test-Header"] == "test-value"
+        with pytest.raises(TypeError):
+            config.extra_headers["X-Test-Header"] = "changed"  # type: ignore[index]
+
+
+class TestLazyImports:
+    """Test that importing the package does not load the server and client stack"""
+
+    @pytest.mark.slow
+    def test_package_import_is_lightweight(self):
+        """Test that fastapi, uvicorn, httpx and websockets are only imported when first used"""
+        code = (
+            "import sys\n"
+            "from fastapi_testing import Config, PortGenerator\n"
+            "loaded = [m for m in ('fastapi', 'uvicorn', 'httpx', 'websockets') if m in sys.modules]\n"
+            "assert not loaded, loaded\n"
+            "from fastapi_testing import UvicornTestServer\n"
+            "assert 'uvicorn' in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
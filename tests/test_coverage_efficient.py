@@ -5,7 +5,7 @@ from unittest.mock import patch
 import pytest
 from fastapi import WebSocket
 
-from fastapi_testing import AsyncTestServer, PortGenerator, create_test_server
+from fastapi_testing import AsyncTestServer, PortGenerator
 
 
 class TestEfficientCoverage:
@@ -15,47 +15,41 @@ class TestEfficientCoverage:
         """Quick test for port exhaustion (lines 170-171)"""
         port_gen = PortGenerator(start=65530, end=65531)
 
+        # Every bind fails on the stub socket, so the real probe runs without creating sockets
         with (
-            patch.object(port_gen, "is_port_available", return_value=False),
+            patch("fastapi_testing.async_fastapi_testing.socket.socket") as mock_socket,
             pytest.raises(RuntimeError, match="No available ports found"),
         ):
+            mock_socket.return_value.bind.side_effect = OSError("Address already in use")
             port_gen.get_port()
 
-    @pytest.mark.asyncio
-    async def test_websocket_message_mismatch_quick(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_message_mismatch_quick(self, shared_server, route_prefix, open_ws):
         """Quick WebSocket message mismatch test (lines 290-293)"""
-        async with create_test_server() as server:
 
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                await websocket.send_json({"actual": "data"})
-                await websocket.close()
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            await websocket.send_json({"actual": "data"})
+            await websocket.close()
 
-            ws_response = await server.client.websocket("/ws")
-            try:
-                with pytest.raises(AssertionError, match="Expected message"):
-                    await server.client.ws.expect_message(ws_response, {"expected": "different"})
-            finally:
-                await ws_response.websocket().close()
+        ws_response = await open_ws(f"{route_prefix}/ws")
+        with pytest.raises(AssertionError, match="Expected message"):
+            await shared_server.client.ws.expect_message(ws_response, {"expected": "different"})
 
-    @pytest.mark.asyncio
-    async def test_text_message_mismatch_quick(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_text_message_mismatch_quick(self, shared_server, route_prefix, open_ws):
         """Quick text message mismatch test (line 293)"""
-        async with create_test_server() as server:
 
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                await websocket.send_text("actual")
-                await websocket.close()
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            await websocket.send_text("actual")
+            await websocket.close()
 
-            ws_response = await server.client.websocket("/ws")
-            try:
-                with pytest.raises(AssertionError, match="Expected message"):
-                    await server.client.ws.expect_message(ws_response, "expected")
-            finally:
-                await ws_response.websocket().close()
+        ws_response = await open_ws(f"{route_prefix}/ws")
+        with pytest.raises(AssertionError, match="Expected message"):
+            await shared_server.client.ws.expect_message(ws_response, "expected")
 
     @pytest.mark.asyncio
     async def test_server_double_start_quick(self):
@@ -75,7 +69,8 @@ class TestEfficientCoverage:
         server = AsyncTestServer(startup_timeout=0.001)
 
         async def slow_wait():
-            await asyncio.sleep(0.1)
+            # Never completes, so the startup timeout fires without sleeping in real time
+            await asyncio.get_running_loop().create_future()
 
         with (
             patch("asyncio.Event.wait", side_effect=slow_wait),
@@ -83,94 +78,90 @@ class TestEfficientCoverage:
         ):
             await server.start()
 
-    @pytest.mark.asyncio
-    async def test_websocket_cleanup_quick(self):
+        # A failed start releases the server task, client and port
+        assert server._server_task is None
+        assert server._client is None
+        assert server._port is None
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_cleanup_quick(self, shared_server, route_prefix, open_ws):
         """Quick WebSocket cleanup test (lines 348-351)"""
         # This test focuses on coverage of cleanup error handling
         # We'll test it indirectly through normal WebSocket operations
-        async with create_test_server() as server:
 
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                await websocket.send_text("test")
-                await websocket.close()
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            await websocket.send_text("test")
+            await websocket.close()
 
-            ws_response = await server.client.websocket("/ws")
-            try:
-                msg = await server.client.ws.receive_text(ws_response)
-                assert msg == "test"
-            finally:
-                await ws_response.websocket().close()
+        ws_response = await open_ws(f"{route_prefix}/ws")
+        msg = await shared_server.client.ws.receive_text(ws_response)
+        assert msg == "test"
 
-    @pytest.mark.asyncio
-    async def test_basic_websocket_operations(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_basic_websocket_operations(self, shared_server, route_prefix, open_ws):
         """Basic WebSocket operations for coverage"""
-        async with create_test_server() as server:
-
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                await websocket.send_text("hello")
-                await websocket.send_json({"msg": "world"})
-                await websocket.send_bytes(b"binary")
-
-                try:
-                    msg = await websocket.receive_text()
-                    if msg == "close":
-                        await websocket.close()
-                except Exception:
-                    pass
-
-            ws_response = await server.client.websocket("/ws")
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            await websocket.send_text("hello")
+            await websocket.send_json({"msg": "world"})
+            await websocket.send_bytes(b"binary")
+
             try:
-                text_msg = await server.client.ws.receive_text(ws_response)
-                assert text_msg == "hello"
+                msg = await websocket.receive_text()
+                if msg == "close":
+                    await websocket.close()
+            except Exception:
+                pass
 
-                json_msg = await server.client.ws.receive_json(ws_response)
-                assert json_msg == {"msg": "world"}
+        ws_response = await open_ws(f"{route_prefix}/ws")
+        text_msg = await shared_server.client.ws.receive_text(ws_response)
+        assert text_msg == "hello"
 
-                binary_msg = await server.client.ws.receive_binary(ws_response)
-                assert binary_msg == b"binary"
+        json_msg = await shared_server.client.ws.receive_json(ws_response)
+        assert json_msg == {"msg": "world"}
 
-                await server.client.ws.send_text(ws_response, "close")
-            finally:
-                await ws_response.websocket().close()
+        binary_msg = await shared_server.client.ws.receive_binary(ws_response)
+        assert binary_msg == b"binary"
+
+        await shared_server.client.ws.send_text(ws_response, "close")
 
     def test_port_operations_quick(self):
         """Quick port operations test"""
         port_gen = PortGenerator()
-        port = port_gen.get_port()
-        assert isinstance(port, int)
-        assert 8000 <= port <= 65535
 
-        port_gen.release_port(port)
-        # Port should be available again
-        available = port_gen.is_port_available(port)
-        assert available is True or available is False  # Either is valid
+        # Every bind succeeds on the stub socket, so no real ports are probed
+        with patch("fastapi_testing.async_fastapi_testing.socket.socket"):
+            port = port_gen.get_port()
+            assert isinstance(port, int)
+            assert port_gen.start <= port <= port_gen.end
 
-    @pytest.mark.asyncio
-    async def test_json_type_check_quick(self):
+            port_gen.release_port(port)
+            # Port should be available again
+            assert port not in port_gen.used_ports
+            assert port_gen.is_port_available(port) is True
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_json_type_check_quick(self, shared_server, route_prefix, open_ws):
         """Quick JSON type check (lines 288-289)"""
-        async with create_test_server() as server:
 
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                await websocket.send_text("not_json_text")
-                await websocket.close()
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            await websocket.send_text("not_json_text")
+            await websocket.close()
 
-            ws_response = await server.client.websocket("/ws")
-            try:
-                # Try to parse non-JSON text as JSON
-                text_msg = await server.client.ws.receive_text(ws_response)
-                assert text_msg == "not_json_text"
+        ws_response = await open_ws(f"{route_prefix}/ws")
+        # Try to parse non-JSON text as JSON
+        text_msg = await shared_server.client.ws.receive_text(ws_response)
+        assert text_msg == "not_json_text"
 
-                # This would trigger JSON parsing if we tried to expect dict
-                with contextlib.suppress(AssertionError, Exception):
-                    await server.client.ws.expect_message(ws_response, {"key": "value"})
-            finally:
-                await ws_response.websocket().close()
+        # This would trigger JSON parsing if we tried to expect dict
+        with contextlib.suppress(AssertionError, Exception):
+            await shared_server.client.ws.expect_message(ws_response, {"key": "value"})
 
     @pytest.mark.asyncio
     async def test_server_lifecycle_quick(self):
@@ -186,29 +177,27 @@ class TestEfficientCoverage:
         await server.stop()
         assert server._server_task is None
 
-    @pytest.mark.asyncio
-    async def test_timeout_scenarios_quick(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_timeout_scenarios_quick(self, shared_server, route_prefix):
         """Quick timeout scenarios"""
-        async with create_test_server() as server:
 
-            @server.app.get("/slow")
-            async def slow_endpoint():
-                await asyncio.sleep(0.01)  # Very short delay
-                return {"status": "ok"}
+        @shared_server.app.get(f"{route_prefix}/slow")
+        async def slow_endpoint():
+            await asyncio.sleep(0)  # Yield to the loop without real waiting
+            return {"status": "ok"}
 
-            response = await server.client.get("/slow")
-            await response.expect_status(200)
-            data = await response.json()
-            assert data["status"] == "ok"
+        response = await shared_server.client.get(f"{route_prefix}/slow")
+        await response.expect_status(200)
+        data = await response.json()
+        assert data["status"] == "ok"
 
-    @pytest.mark.asyncio
-    async def test_error_handling_quick(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_error_handling_quick(self, shared_server, route_prefix):
         """Quick error handling test"""
-        async with create_test_server() as server:
 
-            @server.app.get("/error")
-            async def error_endpoint():
-                raise ValueError("Test error")
+        @shared_server.app.get(f"{route_prefix}/error")
+        async def error_endpoint():
+            raise ValueError("Test error")
 
-            response = await server.client.get("/error")
-            assert response.status_code == 500
+        response = await shared_server.client.get(f"{route_prefix}/error")
+        assert response.status_code == 500
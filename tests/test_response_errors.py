@@ -1,141 +1,165 @@
-import contextlib
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Any
 
+import httpx
 import pytest
-from fastapi import WebSocket, WebSocketDisconnect
+import pytest_asyncio
+from fastapi import WebSocket
+from websockets.protocol import State
 
-from fastapi_testing import InvalidResponseTypeError, create_test_server
+from fastapi_testing import AsyncTestClient, AsyncTestResponse, InvalidResponseTypeError
 
 
-class TestAsyncTestResponseErrors:
-    """Test error handling in AsyncTestResponse"""
+@asynccontextmanager
+async def mock_test_client(payload: Any) -> AsyncGenerator[AsyncTestClient, None]:
+    """Test client answering every request with ``payload`` as JSON, without starting a server."""
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=payload))
+    async with httpx.AsyncClient(transport=transport) as http_client:
+        yield AsyncTestClient("http://testserver", http_client=http_client)
 
-    @pytest.mark.asyncio
-    async def test_http_response_websocket_method_error(self):
-        """Test calling websocket() on HTTP response raises error"""
-        async with create_test_server() as server:
-
-            @server.app.get("/test")
-            async def test_endpoint():
-                return {"message": "success"}
 
-            response = await server.client.get("/test")
+async def accept_only(websocket: WebSocket) -> None:
+    """WebSocket endpoint that only accepts the connection.
 
-            with pytest.raises(InvalidResponseTypeError, match="This response is not a WebSocket connection"):
-                response.websocket()
+    The tests using it probe client-side response errors, so the connection need not stay open.
+    """
+    await websocket.accept()
 
-    @pytest.mark.asyncio
-    async def test_websocket_response_json_error(self):
-        """Test calling json() on WebSocket response raises error"""
-        async with create_test_server() as server:
 
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                # Keep connection open briefly
-                with contextlib.suppress(WebSocketDisconnect):
-                    await websocket.receive_text()
+@pytest_asyncio.fixture(loop_scope="session")
+async def accepted_ws(shared_server, route_prefix, open_ws) -> AsyncTestResponse:
+    """WebSocket response from an ``accept_only`` endpoint on the shared server."""
+    shared_server.app.websocket(f"{route_prefix}/ws")(accept_only)
+    return await open_ws(f"{route_prefix}/ws")
 
-            ws_response = await server.client.websocket("/ws")
 
-            try:
-                with pytest.raises(InvalidResponseTypeError, match="Cannot get JSON directly from WebSocket response"):
-                    await ws_response.json()
-            finally:
-                await ws_response.websocket().close()
+class TestAsyncTestResponseErrors:
+    """Test error handling in AsyncTestResponse"""
 
     @pytest.mark.asyncio
-    async def test_websocket_response_text_error(self):
-        """Test calling text() on WebSocket response raises error"""
-        async with create_test_server() as server:
-
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                with contextlib.suppress(WebSocketDisconnect):
-                    await websocket.receive_text()
-
-            ws_response = await server.client.websocket("/ws")
+    async def test_http_response_websocket_method_error(self):
+        """Test calling websocket() on HTTP response raises error"""
+        async with mock_test_client({"message": "success"}) as client:
+            response = await client.get("/test")
 
-            try:
-                with pytest.raises(InvalidResponseTypeError, match="Cannot get text directly from WebSocket response"):
-                    await ws_response.text()
-            finally:
-                await ws_response.websocket().close()
+        with pytest.raises(InvalidResponseTypeError, match="This response is not a WebSocket connection"):
+            response.websocket()
 
     @pytest.mark.asyncio
-    async def test_websocket_response_status_code_error(self):
-        """Test accessing status_code on WebSocket response raises error"""
-        async with create_test_server() as server:
-
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                with contextlib.suppress(WebSocketDisconnect):
-                    await websocket.receive_text()
-
-            ws_response = await server.client.websocket("/ws")
-
-            try:
-                with pytest.raises(InvalidResponseTypeError, match="WebSocket connections don't have status codes"):
-                    _ = ws_response.status_code
-            finally:
-                await ws_response.websocket().close()
+    async def test_shared_http_client_resolves_relative_urls(self):
+        """Test that a client using a shared httpx client joins paths onto its base URL"""
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"url": str(request.url)}))
+        async with httpx.AsyncClient(transport=transport) as http_client:
+            client = AsyncTestClient("http://testserver/api", http_client=http_client)
+            for url in ("/ping", "ping"):
+                response = await client.get(url)
+                assert (await response.json())["url"] == "http://testserver/api/ping"
+
+            response = await client.get("http://other/ping")
+            assert (await response.json())["url"] == "http://other/ping"
+
+    def test_response_constructor_rejects_unknown_type(self):
+        """Test that AsyncTestResponse refuses objects that are neither HTTP nor WebSocket responses"""
+        with pytest.raises(TypeError, match="Unsupported response type: str"):
+            AsyncTestResponse("not a response")
 
     @pytest.mark.asyncio
-    async def test_websocket_response_expect_status_error(self):
-        """Test calling expect_status() on WebSocket response raises error"""
-        async with create_test_server() as server:
+    async def test_http_response_context_manager_error(self):
+        """Test using an HTTP response as a context manager raises error"""
+        async with mock_test_client({"message": "success"}) as client:
+            response = await client.get("/test")
+
+        with pytest.raises(InvalidResponseTypeError, match="This response is not a WebSocket connection"):
+            async with response:
+                pass
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_response_context_manager_closes(self, shared_server, route_prefix, open_ws):
+        """Test leaving a WebSocket response's context closes the connection"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            await websocket.receive()
+
+        ws_response = await open_ws(f"{route_prefix}/ws")
+        async with ws_response as entered:
+            assert entered is ws_response
+            assert ws_response.websocket().state is State.OPEN
+
+        assert ws_response.websocket().state is State.CLOSED
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_response_context_manager_drops_bookkeeping(self, shared_server, route_prefix):
+        """Test leaving a WebSocket response's context makes the client forget the connection"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            await websocket.receive()
+
+        async with AsyncTestClient(shared_server.base_url) as client:
+            async with await client.websocket(f"{route_prefix}/ws", batch=True):
+                assert client._websocket_connections
+                assert client._websocket_batches
+
+            assert not client._websocket_connections
+            assert not client._websocket_batches
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_response_json_error(self, accepted_ws):
+        """Test calling json() on WebSocket response raises error"""
+        with pytest.raises(InvalidResponseTypeError, match="Cannot get JSON directly from WebSocket response"):
+            await accepted_ws.json()
 
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                with contextlib.suppress(WebSocketDisconnect):
-                    await websocket.receive_text()
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_response_text_error(self, accepted_ws):
+        """Test calling text() on WebSocket response raises error"""
+        with pytest.raises(InvalidResponseTypeError, match="Cannot get text directly from WebSocket response"):
+            await accepted_ws.text()
 
-            ws_response = await server.client.websocket("/ws")
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_response_status_code_error(self, accepted_ws):
+        """Test accessing status_code on WebSocket response raises error"""
+        with pytest.raises(InvalidResponseTypeError, match="WebSocket connections don't have status codes"):
+            _ = accepted_ws.status_code
 
-            try:
-                with pytest.raises(InvalidResponseTypeError, match="WebSocket connections don't have status codes"):
-                    await ws_response.expect_status(200)
-            finally:
-                await ws_response.websocket().close()
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_response_expect_status_error(self, accepted_ws):
+        """Test calling expect_status() on WebSocket response raises error"""
+        with pytest.raises(InvalidResponseTypeError, match="WebSocket connections don't have status codes"):
+            await accepted_ws.expect_status(200)
 
-    @pytest.mark.asyncio
-    async def test_websocket_response_headers_error(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_response_headers_error(self, accepted_ws):
         """Test accessing headers on WebSocket response raises error"""
-        async with create_test_server() as server:
-
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                with contextlib.suppress(WebSocketDisconnect):
-                    await websocket.receive_text()
-
-            ws_response = await server.client.websocket("/ws")
-
-            try:
-                with pytest.raises(InvalidResponseTypeError, match="WebSocket connections don't have headers"):
-                    _ = ws_response.headers
-            finally:
-                await ws_response.websocket().close()
+        with pytest.raises(InvalidResponseTypeError, match="WebSocket connections don't have headers"):
+            _ = accepted_ws.headers
 
     @pytest.mark.asyncio
     async def test_http_response_normal_operations(self):
         """Test that HTTP responses work normally (for comparison)"""
-        async with create_test_server() as server:
-
-            @server.app.get("/test")
-            async def test_endpoint():
-                return {"message": "success"}
-
-            response = await server.client.get("/test")
-
-            # These should all work fine
-            assert response.status_code == 200
-            await response.expect_status(200)
-            data = await response.json()
-            assert data["message"] == "success"
-            text = await response.text()
-            assert "success" in text
-            # Test headers access works for HTTP responses
-            assert response.headers is not None
+        async with mock_test_client({"message": "success"}) as client:
+            response = await client.get("/test")
+
+        # These should all work fine
+        assert response.status_code == 200
+        data = await response.json()
+        assert data["message"] == "success"
+        text = await response.text()
+        assert "success" in text
+        # Decoding in a worker thread gives the same results
+        assert await response.json(await_in_thread=True) == data
+        assert await response.text(await_in_thread=True) == text
+        # Test headers access works for HTTP responses
+        assert response.headers is not None
+
+    def test_response_constructor_dispatches_on_type(self):
+        """Test that AsyncTestResponse wraps HTTP responses in the HTTP specialization"""
+        response = AsyncTestResponse(httpx.Response(200, json={"message": "success"}))
+
+        assert isinstance(response, AsyncTestResponse)
+        assert response.status_code == 200
+        with pytest.raises(InvalidResponseTypeError, match="This response is not a WebSocket connection"):
+            response.websocket()
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import logging
 from contextlib import asynccontextmanager
 from datetime import UTC, datetime
@@ -6,6 +7,7 @@ from enum import StrEnum
 from typing import Annotated
 from uuid import UUID, uuid4
 
+import httpx
 import pytest
 from fastapi import FastAPI, Response
 from pydantic import BaseModel, ConfigDict, Field, computed_field
@@ -51,6 +53,23 @@ class ItemModel(BaseModel):
         return bool(self.tags)
 
 
+# Constants for tests that never inspect generated ids or tags
+FIXED_UUID = UUID("00000000-0000-0000-0000-000000000001")
+TEST_TAGS = [Tag(name="test", color="#ff0000")]
+
+# Request bodies are serialized once at import instead of on every request
+JSON_HEADERS = {"Content-Type": "application/json"}
+NEW_ITEM = {
+    "name": "Test Item",
+    "price": 10.99,
+    "description": "A test item",
+    "tags": [{"name": "test", "color": "#ff0000"}],
+}
+NEW_ITEM_BYTES = json.dumps(NEW_ITEM).encode()
+UPDATED_ITEM = {"name": "Updated Item", "price": 20.99, "description": "An updated item"}
+UPDATED_ITEM_BYTES = json.dumps(UPDATED_ITEM).encode()
+
+
 # Test cases using the improved test server
 @pytest.mark.asyncio
 async def test_basic_endpoint():
@@ -76,157 +95,162 @@ async def test_basic_endpoint():
         assert data["message"] == "success"
 
 
-@pytest.mark.asyncio
-async def test_create_item():
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_item(shared_server, route_prefix):
     """Test POST endpoint with JSON payload"""
-    async with create_test_server() as server:
-
-        @server.app.post("/items", status_code=201, response_model=ItemModel)
-        async def create_item(item: ItemModel):
-            return item
 
-        test_item = {
-            "name": "Test Item",
-            "price": 10.99,
-            "description": "A test item",
-            "tags": [{"name": "test", "color": "#ff0000"}],
-        }
+    @shared_server.app.post(f"{route_prefix}/items", status_code=201, response_model=ItemModel)
+    async def create_item(item: ItemModel):
+        return item
 
-        response = await server.client.post("/items", json=test_item)
-        await response.expect_status(201)
-        data = await response.json()
-        assert data["name"] == test_item["name"]
-        assert data["price"] == test_item["price"]
+    response = await shared_server.client.post(f"{route_prefix}/items", content=NEW_ITEM_BYTES, headers=JSON_HEADERS)
+    await response.expect_status(201)
+    data = await response.json()
+    assert data["name"] == NEW_ITEM["name"]
+    assert data["price"] == NEW_ITEM["price"]
 
 
-@pytest.mark.asyncio
-async def test_get_items():
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_items(shared_server, route_prefix):
     """Test GET endpoint returning a list"""
-    async with create_test_server() as server:
 
-        @server.app.get("/items", response_model=list[ItemModel])
-        async def get_items():
-            items = [
-                ItemModel(name=f"Item {i}", price=10.99 * i, tags=[Tag(name="test", color="#ff0000")]) for i in range(3)
-            ]
-            return items
+    @shared_server.app.get(f"{route_prefix}/items", response_model=list[ItemModel])
+    async def get_items():
+        items = [ItemModel(name=f"Item {i}", price=10.99 * i, tags=TEST_TAGS) for i in range(3)]
+        return items
 
-        response = await server.client.get("/items")
-        await response.expect_status(200)
-        data = await response.json()
-        assert len(data) == 3
-        assert all(item["name"].startswith("Item") for item in data)
+    response = await shared_server.client.get(f"{route_prefix}/items")
+    await response.expect_status(200)
+    data = await response.json()
+    assert len(data) == 3
+    assert all(item["name"].startswith("Item") for item in data)
 
 
-@pytest.mark.asyncio
-async def test_update_item():
+@pytest.mark.asyncio(loop_scope="session")
+async def test_update_item(shared_server, route_prefix):
     """Test PUT endpoint"""
-    async with create_test_server() as server:
-        items = {}
-
-        @server.app.put("/items/{item_id}")
-        async def update_item(item_id: UUID, item: ItemModel):
-            items[item_id] = item
-            return item
+    items = {}
 
-        item_id = uuid4()
-        test_item = {"name": "Updated Item", "price": 20.99, "description": "An updated item"}
+    @shared_server.app.put(f"{route_prefix}/items/{{item_id}}")
+    async def update_item(item_id: UUID, item: ItemModel):
+        items[item_id] = item
+        return item
 
-        response = await server.client.put(f"/items/{item_id}", json=test_item)
-        await response.expect_status(200)
-        data = await response.json()
-        assert data["name"] == test_item["name"]
-        assert data["price"] == test_item["price"]
+    item_id = FIXED_UUID
+    response = await shared_server.client.put(
+        f"{route_prefix}/items/{item_id}", content=UPDATED_ITEM_BYTES, headers=JSON_HEADERS
+    )
+    await response.expect_status(200)
+    data = await response.json()
+    assert data["name"] == UPDATED_ITEM["name"]
+    assert data["price"] == UPDATED_ITEM["price"]
 
 
-@pytest.mark.asyncio
-async def test_delete_item():
+@pytest.mark.asyncio(loop_scope="session")
+async def test_delete_item(shared_server, route_prefix):
     """Test DELETE endpoint"""
-    async with create_test_server() as server:
 
-        @server.app.delete("/items/{item_id}", status_code=204)
-        async def delete_item(item_id: UUID):
-            return None
+    @shared_server.app.delete(f"{route_prefix}/items/{{item_id}}", status_code=204)
+    async def delete_item(item_id: UUID):
+        return None
 
-        item_id = uuid4()
-        response = await server.client.delete(f"/items/{item_id}")
-        await response.expect_status(204)
+    item_id = FIXED_UUID
+    response = await shared_server.client.delete(f"{route_prefix}/items/{item_id}")
+    await response.expect_status(204)
 
 
-@pytest.mark.asyncio
-async def test_error_handling():
+@pytest.mark.asyncio(loop_scope="session")
+async def test_error_handling(shared_server, route_prefix):
     """Test error responses"""
-    async with create_test_server() as server:
 
-        @server.app.get("/error")
-        async def error_endpoint():
-            raise ValueError("Test error")
+    @shared_server.app.get(f"{route_prefix}/error")
+    async def error_endpoint():
+        raise ValueError("Test error")
 
-        response = await server.client.get("/error")
-        await response.expect_status(500)
+    response = await shared_server.client.get(f"{route_prefix}/error")
+    await response.expect_status(500)
 
 
-@pytest.mark.asyncio
-async def test_multiple_requests():
+@pytest.mark.asyncio(loop_scope="session")
+async def test_multiple_requests(shared_server, route_prefix):
     """Test multiple concurrent requests"""
-    async with create_test_server() as server:
 
-        @server.app.get("/ping")
-        async def ping():
-            return {"status": "ok"}
+    @shared_server.app.get(f"{route_prefix}/ping")
+    async def ping():
+        return {"status": "ok"}
 
-        # Make multiple concurrent requests
-        responses = await asyncio.gather(*[server.client.get("/ping") for _ in range(5)])
+    # Make multiple concurrent requests
+    responses = await asyncio.gather(*[shared_server.client.get(f"{route_prefix}/ping") for _ in range(5)])
 
-        for response in responses:
-            await response.expect_status(200)
-            data = await response.json()
-            assert data["status"] == "ok"
+    await asyncio.gather(*(response.expect_status(200) for response in responses))
+    bodies = await asyncio.gather(*(response.json() for response in responses))
+    assert all(data["status"] == "ok" for data in bodies)
 
 
-@pytest.mark.asyncio
-async def test_response_headers():
+@pytest.mark.asyncio(loop_scope="session")
+async def test_response_headers(shared_server, route_prefix):
     """Test accessing response headers"""
-    async with create_test_server() as server:
-
-        @server.app.get("/test-headers")
-        async def test_headers_endpoint():
-            return Response(
-                content="test content",
-                headers={
-                    "X-Custom-Header": "custom-value",
-                    "Content-Type": "text/plain",
-                },
-            )
-
-        response = await server.client.get("/test-headers")
-        await response.expect_status(200)
 
-        # Test accessing headers via the new property
-        assert response.headers["X-Custom-Header"] == "custom-value"
-        assert response.headers["Content-Type"] == "text/plain"
+    @shared_server.app.get(f"{route_prefix}/test-headers")
+    async def test_headers_endpoint():
+        return Response(
+            content="test content",
+            headers={
+                "X-Custom-Header": "custom-value",
+                "Content-Type": "text/plain",
+            },
+        )
 
-        # Headers should be case-insensitive
-        assert response.headers.get("x-custom-header") == "custom-value"
+    response = await shared_server.client.get(f"{route_prefix}/test-headers")
+    await response.expect_status(200)
 
+    # Test accessing headers via the new property
+    assert response.headers["X-Custom-Header"] == "custom-value"
+    assert response.headers["Content-Type"] == "text/plain"
 
-@pytest.mark.asyncio
-async def test_redirect_with_location_header():
+    # Headers should be case-insensitive
+    assert response.headers.get("x-custom-header") == "custom-value"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_redirect_with_location_header(shared_server, route_prefix):
     """Test redirect response with Location header"""
-    async with create_test_server() as server:
 
-        @server.app.post("/login")
-        async def login_endpoint():
-            return Response(status_code=302, headers={"Location": "/dashboard"})
+    @shared_server.app.post(f"{route_prefix}/login")
+    async def login_endpoint():
+        return Response(status_code=302, headers={"Location": "/dashboard"})
 
-        # Don't follow redirects to test the Location header
-        response = await server.client.post("/login", follow_redirects=False)
-        await response.expect_status(302)
+    # Don't follow redirects to test the Location header
+    response = await shared_server.client.post(f"{route_prefix}/login", follow_redirects=False)
+    await response.expect_status(302)
 
-        # Test the new public API for accessing headers
-        assert response.headers["Location"] == "/dashboard"
-        location = response.headers.get("location")
-        assert location == "/dashboard"
+    # Test the new public API for accessing headers
+    assert response.headers["Location"] == "/dashboard"
+    location = response.headers.get("location")
+    assert location == "/dashboard"
+
+
+@pytest.mark.asyncio
+async def test_shared_http_client():
+    """Test that servers can share one HTTP client, which outlives them"""
+    async with httpx.AsyncClient() as http_client:
+        for name in ("first", "second"):
+            async with create_test_server(http_client=http_client) as server:
+                # Use a closure to capture the current value of name
+                def make_endpoint(server_name):
+                    async def name_endpoint():
+                        return {"name": server_name}
+
+                    return name_endpoint
+
+                server.app.get("/name")(make_endpoint(name))
+
+                response = await server.client.get("/name")
+                await response.expect_status(200)
+                data = await response.json()
+                assert data["name"] == name
+
+        assert not http_client.is_closed
 
 
 if __name__ == "__main__":
@@ -1,12 +1,14 @@
 import asyncio
+import contextlib
 from contextlib import asynccontextmanager
 
 import pytest
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 
-from fastapi_testing import AsyncTestServer, create_test_server
+from fastapi_testing import AsyncTestClient, AsyncTestServer, create_test_server
 
 
+@pytest.mark.xdist_group("lifecycle")
 class TestServerLifecycle:
     """Real-world server lifecycle and error handling tests"""
 
@@ -39,62 +41,59 @@ class TestServerLifecycle:
         # After context exit, shutdown should be called
         assert shutdown_called is True
 
-    @pytest.mark.asyncio
-    async def test_server_with_exception_handling(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_server_with_exception_handling(self, shared_server, route_prefix):
         """Test server error handling for various HTTP errors"""
-        async with create_test_server() as server:
 
-            @server.app.get("/error/{status_code}")
-            async def error_endpoint(status_code: int):
-                if status_code == 404:
-                    raise HTTPException(status_code=404, detail="Not found")
-                elif status_code == 500:
-                    raise HTTPException(status_code=500, detail="Internal server error")
-                elif status_code == 400:
-                    raise HTTPException(status_code=400, detail="Bad request")
-                else:
-                    return {"status": "ok"}
+        @shared_server.app.get(f"{route_prefix}/error/{{status_code}}")
+        async def error_endpoint(status_code: int):
+            if status_code == 404:
+                raise HTTPException(status_code=404, detail="Not found")
+            elif status_code == 500:
+                raise HTTPException(status_code=500, detail="Internal server error")
+            elif status_code == 400:
+                raise HTTPException(status_code=400, detail="Bad request")
+            else:
+                return {"status": "ok"}
 
-            # Test various error codes
-            response_404 = await server.client.get("/error/404")
-            assert response_404.status_code == 404
+        # Test various error codes
+        response_404 = await shared_server.client.get(f"{route_prefix}/error/404")
+        assert response_404.status_code == 404
 
-            response_500 = await server.client.get("/error/500")
-            assert response_500.status_code == 500
+        response_500 = await shared_server.client.get(f"{route_prefix}/error/500")
+        assert response_500.status_code == 500
 
-            response_400 = await server.client.get("/error/400")
-            assert response_400.status_code == 400
+        response_400 = await shared_server.client.get(f"{route_prefix}/error/400")
+        assert response_400.status_code == 400
 
-            # Test successful response
-            response_200 = await server.client.get("/error/200")
-            await response_200.expect_status(200)
+        # Test successful response
+        response_200 = await shared_server.client.get(f"{route_prefix}/error/200")
+        await response_200.expect_status(200)
 
-    @pytest.mark.asyncio
-    async def test_server_concurrent_requests_with_delays(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_server_concurrent_requests_with_delays(self, shared_server, route_prefix):
         """Test server handling concurrent requests with artificial delays"""
-        async with create_test_server() as server:
-
-            @server.app.get("/slow/{delay}")
-            async def slow_endpoint(delay: float):
-                await asyncio.sleep(delay)
-                return {"delay": delay, "message": "completed"}
-
-            # Make concurrent requests with different delays
-            tasks = [
-                server.client.get("/slow/0.1"),
-                server.client.get("/slow/0.05"),
-                server.client.get("/slow/0.15"),
-                server.client.get("/slow/0.02"),
-            ]
-
-            responses = await asyncio.gather(*tasks)
-
-            # All should succeed
-            for response in responses:
-                await response.expect_status(200)
-                data = await response.json()
-                assert "delay" in data
-                assert "message" in data
+
+        @shared_server.app.get(f"{route_prefix}/slow/{{delay}}")
+        async def slow_endpoint(delay: float):
+            await asyncio.sleep(delay)
+            return {"delay": delay, "message": "completed"}
+
+        # Make concurrent requests with different delays, short enough to keep the test fast
+        # but distinct so the responses still complete out of request order
+        tasks = [
+            shared_server.client.get(f"{route_prefix}/slow/0.004"),
+            shared_server.client.get(f"{route_prefix}/slow/0.002"),
+            shared_server.client.get(f"{route_prefix}/slow/0.006"),
+            shared_server.client.get(f"{route_prefix}/slow/0"),
+        ]
+
+        responses = await asyncio.gather(*tasks)
+
+        # All should succeed
+        await asyncio.gather(*(response.expect_status(200) for response in responses))
+        bodies = await asyncio.gather(*(response.json() for response in responses))
+        assert all("delay" in data and "message" in data for data in bodies)
 
     @pytest.mark.asyncio
     async def test_server_manual_lifecycle(self):
@@ -102,7 +101,7 @@ class TestServerLifecycle:
         server = AsyncTestServer()
 
         # Server should not be running initially
-        assert not hasattr(server, "_server_task") or server._server_task is None
+        assert server._server_task is None
 
         try:
             await server.start()
@@ -121,38 +120,71 @@ class TestServerLifecycle:
         finally:
             await server.stop()
 
+    @pytest.mark.asyncio
+    async def test_server_stop_closes_open_websockets(self):
+        """Test that stopping the server shuts down connections it did not open itself"""
+        server = AsyncTestServer()
+        await server.start()
+
+        @server.app.websocket("/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            with contextlib.suppress(WebSocketDisconnect):
+                while True:
+                    await websocket.receive_text()
+
+        # A separate client keeps its connection open while the server stops
+        async with AsyncTestClient(server.base_url) as client:
+            ws_response = await client.websocket("/ws")
+            await server.stop()
+
+            ws = ws_response.websocket()
+            await ws.wait_closed()
+            # uvicorn closes WebSockets with 1012 (service restart) on shutdown
+            assert ws.close_code == 1012
+
+        assert server._server_task is None
+
+    @pytest.mark.asyncio
+    async def test_server_exits_promptly_on_external_should_exit(self):
+        """Test that setting should_exit directly wakes the server without waiting for a tick"""
+        server = AsyncTestServer()
+        await server.start()
+        try:
+            server._server.should_exit = True
+            # uvicorn's own loop and the once-per-second tick would take far longer
+            async with asyncio.timeout(0.5):
+                await asyncio.shield(server._server_task)
+        finally:
+            await server.stop()
+
     @pytest.mark.asyncio
     async def test_server_port_allocation_and_release(self):
         """Test that ports are properly allocated and released"""
         # Create multiple servers to test port management
-        servers = []
-        ports = []
-
-        try:
-            # Create multiple servers
-            for i in range(3):
-                server = AsyncTestServer()
-                await server.start()
-                servers.append(server)
-                ports.append(server._port)
+        servers = [AsyncTestServer() for _ in range(3)]
 
-                # Verify each server gets a different port
-                # Use a closure to capture the current value of i
-                def make_endpoint(server_id):
-                    async def test_endpoint():
-                        return {"server": server_id}
+        # Use a closure to capture the current value of i
+        def make_endpoint(server_id):
+            async def test_endpoint():
+                return {"server": server_id}
 
-                    return test_endpoint
+            return test_endpoint
 
-                server.app.get(f"/server-{i}")(make_endpoint(i))
+        try:
+            # Start all servers at once
+            await asyncio.gather(*(server.start() for server in servers))
+            ports = [server._port for server in servers]
 
-            # All ports should be different
+            # Verify each server gets a different port
             assert len(set(ports)) == len(ports)
 
-            # All servers should be reachable
             for i, server in enumerate(servers):
-                response = await server.client.get(f"/server-{i}")
-                await response.expect_status(200)
+                server.app.get(f"/server-{i}")(make_endpoint(i))
+
+            # All servers should be reachable
+            responses = await asyncio.gather(*(server.client.get(f"/server-{i}") for i, server in enumerate(servers)))
+            await asyncio.gather(*(response.expect_status(200) for response in responses))
 
         finally:
             # Clean up all servers
@@ -212,24 +244,23 @@ class TestServerLifecycle:
             await server.stop()
 
             # Verify cleanup completed
-            assert server._server_task is None or server._server_task.done()
+            assert server._server_task is None
 
-    @pytest.mark.asyncio
-    async def test_invalid_client_requests(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_invalid_client_requests(self, shared_server, route_prefix):
         """Test client behavior with invalid requests"""
-        async with create_test_server() as server:
-
-            @server.app.get("/valid")
-            async def valid_endpoint():
-                return {"valid": True}
-
-            # Test request to non-existent endpoint
-            response = await server.client.get("/nonexistent")
-            assert response.status_code == 404
-
-            # Test malformed JSON in POST request
-            response = await server.client.post(
-                "/valid", headers={"Content-Type": "application/json"}, content="invalid-json"
-            )
-            # Server should handle malformed JSON gracefully
-            assert response.status_code in [400, 405, 422]  # Bad request, method not allowed, or validation error
+
+        @shared_server.app.get(f"{route_prefix}/valid")
+        async def valid_endpoint():
+            return {"valid": True}
+
+        # Test request to non-existent endpoint
+        response = await shared_server.client.get(f"{route_prefix}/nonexistent")
+        assert response.status_code == 404
+
+        # Test malformed JSON in POST request
+        response = await shared_server.client.post(
+            f"{route_prefix}/valid", headers={"Content-Type": "application/json"}, content="invalid-json"
+        )
+        # Server should handle malformed JSON gracefully
+        assert response.status_code in [400, 405, 422]  # Bad request, method not allowed, or validation error
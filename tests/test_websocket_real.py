@@ -1,227 +1,515 @@
 import asyncio
+import contextlib
+import json
+import socket
+import time
 
 import pytest
 from fastapi import WebSocket, WebSocketDisconnect
+from websockets.exceptions import InvalidHandshake, InvalidMessage
+from websockets.protocol import State
 
-from fastapi_testing import WebSocketConfig, create_test_server
+from fastapi_testing import (
+    AsyncTestClient,
+    AsyncTestResponse,
+    BatchingWebSocketHelper,
+    InvalidResponseTypeError,
+    WebSocketConfig,
+    global_config,
+)
 
 
 class TestWebSocketRealWorld:
     """Real-world WebSocket testing scenarios"""
 
-    @pytest.mark.asyncio
-    async def test_websocket_type_errors_real(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_type_errors_real(self, shared_server, route_prefix):
         """Test WebSocket helper methods with actual mismatched data types"""
-        async with create_test_server() as server:
 
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                try:
-                    while True:
-                        # Send binary data when client expects text/JSON
-                        await websocket.send_bytes(b"binary_response")
-                        await asyncio.sleep(0.1)
-                except WebSocketDisconnect:
-                    pass
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            # Send binary data when client expects text/JSON, then wait for the client to close
+            await websocket.send_bytes(b"binary_response")
+            await websocket.receive()
 
-            ws_response = await server.client.websocket("/ws")
+        async with await shared_server.client.websocket(f"{route_prefix}/ws") as ws_response:
+            # Try to receive JSON but server sends binary - should raise TypeError
+            with pytest.raises(TypeError, match="Expected text data to decode JSON, got <class 'bytes'>"):
+                await shared_server.client.ws.receive_json(ws_response)
 
-            try:
-                # Try to receive JSON but server sends binary - should raise TypeError
-                with pytest.raises(TypeError, match="Expected text data to decode JSON, got <class 'bytes'>"):
-                    await server.client.ws.receive_json(ws_response)
-            finally:
-                await ws_response.websocket().close()
-
-    @pytest.mark.asyncio
-    async def test_websocket_receive_text_from_binary(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_receive_text_from_binary(self, shared_server, route_prefix):
         """Test receiving text when binary data is sent"""
-        async with create_test_server() as server:
-
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                try:
-                    # Send binary data
-                    await websocket.send_bytes(b"binary_data")
-                    await websocket.receive()  # Wait for client
-                except WebSocketDisconnect:
-                    pass
-
-            ws_response = await server.client.websocket("/ws")
 
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
             try:
-                # Try to receive text but server sends binary
-                with pytest.raises(TypeError, match="Expected str, got <class 'bytes'>"):
-                    await server.client.ws.receive_text(ws_response)
-            finally:
-                await ws_response.websocket().close()
-
-    @pytest.mark.asyncio
-    async def test_websocket_receive_binary_from_text(self):
+                # Send binary data
+                await websocket.send_bytes(b"binary_data")
+                await websocket.receive()  # Wait for client
+            except WebSocketDisconnect:
+                pass
+
+        async with await shared_server.client.websocket(f"{route_prefix}/ws") as ws_response:
+            # Try to receive text but server sends binary
+            with pytest.raises(TypeError, match="Expected str, got <class 'bytes'>"):
+                await shared_server.client.ws.receive_text(ws_response)
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_receive_binary_from_text(self, shared_server, route_prefix):
         """Test receiving binary when text data is sent"""
-        async with create_test_server() as server:
-
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                try:
-                    # Send text data
-                    await websocket.send_text("text_data")
-                    await websocket.receive()  # Wait for client
-                except WebSocketDisconnect:
-                    pass
-
-            ws_response = await server.client.websocket("/ws")
 
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
             try:
-                # Try to receive binary but server sends text
-                with pytest.raises(TypeError, match="Expected bytes, got <class 'str'>"):
-                    await server.client.ws.receive_binary(ws_response)
-            finally:
-                await ws_response.websocket().close()
-
-    @pytest.mark.asyncio
-    async def test_websocket_expect_message_timeout(self):
+                # Send text data
+                await websocket.send_text("text_data")
+                await websocket.receive()  # Wait for client
+            except WebSocketDisconnect:
+                pass
+
+        async with await shared_server.client.websocket(f"{route_prefix}/ws") as ws_response:
+            # Try to receive binary but server sends text
+            with pytest.raises(TypeError, match="Expected bytes, got <class 'str'>"):
+                await shared_server.client.ws.receive_binary(ws_response)
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_expect_message_timeout(self, shared_server, route_prefix):
         """Test expect_message with real timeout scenario"""
-        async with create_test_server() as server:
-
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                try:
-                    # Wait for client message
-                    await websocket.receive_text()
-                    # Delay response longer than timeout
-                    await asyncio.sleep(0.2)
-                    await websocket.send_text("delayed_response")
-                except WebSocketDisconnect:
-                    pass
-
-            ws_response = await server.client.websocket("/ws")
+        delay_gate = asyncio.Event()
 
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            try:
+                # Wait for client message
+                await websocket.receive_text()
+                # Hold the response back until the client has timed out
+                await delay_gate.wait()
+                await websocket.send_text("delayed_response")
+            except WebSocketDisconnect:
+                pass
+
+        async with await shared_server.client.websocket(f"{route_prefix}/ws") as ws_response:
             try:
                 # Send a message first
-                await server.client.ws.send_text(ws_response, "trigger")
+                await shared_server.client.ws.send_text(ws_response, "trigger")
 
                 # Expect a specific message but timeout before it arrives
                 with pytest.raises(TimeoutError):
-                    await server.client.ws.expect_message(ws_response, expected="expected_message", timeout=0.1)
+                    await shared_server.client.ws.expect_message(ws_response, expected="expected_message", timeout=0.02)
             finally:
-                await ws_response.websocket().close()
+                delay_gate.set()
 
-    @pytest.mark.asyncio
-    async def test_websocket_drain_messages_timeout(self):
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_drain_messages_timeout(self, shared_server, route_prefix):
         """Test drain_messages with timeout"""
-        async with create_test_server() as server:
-
-            @server.app.websocket("/ws")
-            async def ws_endpoint(websocket: WebSocket):
-                await websocket.accept()
-                try:
-                    # Send a few quick messages
-                    await websocket.send_text("message1")
-                    await websocket.send_text("message2")
-                    # Then wait longer than timeout
-                    await asyncio.sleep(0.2)
-                    await websocket.send_text("delayed_message")
-                except WebSocketDisconnect:
-                    pass
-
-            ws_response = await server.client.websocket("/ws")
+        delay_gate = asyncio.Event()
 
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            try:
+                # Send a few quick messages
+                await websocket.send_text("message1")
+                await websocket.send_text("message2")
+                # Then hold the next one back until the client has stopped draining
+                await delay_gate.wait()
+                await websocket.send_text("delayed_message")
+            except WebSocketDisconnect:
+                pass
+
+        async with await shared_server.client.websocket(f"{route_prefix}/ws") as ws_response:
             try:
                 # Drain messages with short timeout
-                messages = await server.client.ws.drain_messages(ws_response, timeout=0.1)
+                messages = await shared_server.client.ws.drain_messages(ws_response, timeout=0.02)
 
                 # Should get the first two messages before timeout
                 assert len(messages) == 2
                 assert messages[0] == "message1"
                 assert messages[1] == "message2"
             finally:
-                await ws_response.websocket().close()
-
-    @pytest.mark.asyncio
-    async def test_websocket_config_with_custom_settings(self):
-        """Test WebSocket connection with custom configuration"""
-        async with create_test_server() as server:
-
-            @server.app.websocket("/ws")
-            async def ws_endpoint(ws: WebSocket):
-                await ws.accept(subprotocol="test-protocol")
-                try:
-                    message = await ws.receive_text()
-                    await ws.send_text(f"echo: {message}")
-                except WebSocketDisconnect:
-                    pass
-
-            config = WebSocketConfig(
-                subprotocols=["test-protocol"],
-                extra_headers={"X-Test-Header": "test-value"},
-                ping_interval=30.0,
-                ping_timeout=10.0,
-                timeout=5.0,
-                max_size=1024 * 1024,  # 1MB
-                max_queue=16,
-            )
+                delay_gate.set()
 
-            ws_response = await server.client.websocket("/ws", config=config)
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_drain_messages_max_messages(self, shared_server, route_prefix):
+        """Test drain_messages stops at max_messages and leaves the rest queued"""
 
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
             try:
-                # Test that the connection works with custom config
-                await server.client.ws.send_text(ws_response, "test_message")
-                response = await server.client.ws.receive_text(ws_response)
-                assert response == "echo: test_message"
-
-                # Verify the subprotocol was selected
-                websocket = ws_response.websocket()
-                assert websocket.subprotocol == "test-protocol"
-            finally:
-                await ws_response.websocket().close()
+                for i in range(3):
+                    await websocket.send_text(f"message{i}")
+                await websocket.receive_text()
+            except WebSocketDisconnect:
+                pass
+
+        async with await shared_server.client.websocket(f"{route_prefix}/ws") as ws_response:
+            messages = await shared_server.client.ws.drain_messages(ws_response, timeout=1.0, max_messages=2)
+            assert messages == ["message0", "message1"]
+            assert await shared_server.client.ws.receive_text(ws_response) == "message2"
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_drain_messages_idle_timeout(self, shared_server, route_prefix):
+        """Test drain_messages keeps reading while messages arrive within the timeout"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            try:
+                # Total time exceeds the timeout, but each gap is shorter than it
+                for i in range(4):
+                    await websocket.send_text(f"message{i}")
+                    await asyncio.sleep(0.03)
+                await websocket.receive_text()
+            except WebSocketDisconnect:
+                pass
+
+        async with await shared_server.client.websocket(f"{route_prefix}/ws") as ws_response:
+            messages = await shared_server.client.ws.drain_messages(ws_response, timeout=0.1)
+            assert messages == ["message0", "message1", "message2", "message3"]
 
     @pytest.mark.asyncio
-    async def test_websocket_connection_failure_scenarios(self):
+    async def test_websocket_drain_messages_without_frame_buffer(self):
+        """Test drain_messages still resets its idle timeout when the connection exposes no frame buffer"""
+
+        class GappedConnection:
+            """Connection without websockets' internal buffer, delivering messages with short gaps"""
+
+            def __init__(self, messages):
+                self._messages = list(messages)
+
+            async def recv(self):
+                if not self._messages:
+                    await asyncio.Event().wait()
+                await asyncio.sleep(0.01)
+                return self._messages.pop(0)
+
+        class GappedResponse:
+            def __init__(self):
+                self._ws = GappedConnection(f"message{i}" for i in range(4))
+
+            def websocket(self):
+                return self._ws
+
+        # Total time exceeds the timeout, but each gap is shorter than it
+        messages = await BatchingWebSocketHelper.drain_messages(GappedResponse(), timeout=0.025)
+        assert messages == ["message0", "message1", "message2", "message3"]
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_config_with_custom_settings(self, shared_server, route_prefix):
+        """Test WebSocket connection with custom configuration"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(ws: WebSocket):
+            await ws.accept(subprotocol="test-protocol")
+            # The test makes a single round trip
+            message = await ws.receive_text()
+            await ws.send_text(f"echo: {message}")
+
+        config = WebSocketConfig(
+            subprotocols=["test-protocol"],
+            extra_headers={"X-Test-Header": "test-value"},
+            ping_interval=30.0,
+            ping_timeout=10.0,
+            timeout=5.0,
+            max_size=1024 * 1024,  # 1MB
+            max_queue=16,
+        )
+
+        async with await shared_server.client.websocket(f"{route_prefix}/ws", config=config) as ws_response:
+            # Test that the connection works with custom config
+            await shared_server.client.ws.send_text(ws_response, "test_message")
+            response = await shared_server.client.ws.receive_text(ws_response)
+            assert response == "echo: test_message"
+
+            # Verify the subprotocol was selected
+            websocket = ws_response.websocket()
+            assert websocket.subprotocol == "test-protocol"
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_connection_failure_scenarios(self, shared_server, route_prefix):
         """Test WebSocket connection failure and retry scenarios"""
         # Test connection to invalid endpoint
-        async with create_test_server() as server:
-            # Don't define any WebSocket endpoint
+        # Don't define any WebSocket endpoint
+
+        # The handshake is rejected, which fails immediately instead of being retried
+        start = time.perf_counter()
+        with pytest.raises(InvalidHandshake):
+            await shared_server.client.websocket(f"{route_prefix}/nonexistent")
+        assert time.perf_counter() - start < global_config.WS_RETRY_DELAY
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_websocket_connection_refused_is_retried(self, monkeypatch):
+        """Test that refused connections are retried before the error is raised"""
+        monkeypatch.setattr(global_config, "WS_RETRY_ATTEMPTS", 3)
+        monkeypatch.setattr(global_config, "WS_RETRY_DELAY", 0.05)
+
+        # Bind and release a port so nothing is listening on it
+        with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        async with AsyncTestClient(f"http://127.0.0.1:{port}") as client:
+            start = time.perf_counter()
+            with pytest.raises(OSError):
+                await client.websocket("/ws")
 
-            # This should fail to connect
-            with pytest.raises(Exception):  # WebSocket connection will fail
-                await server.client.websocket("/nonexistent")
+        # Two backoff sleeps of 0.05s and 0.1s, each jittered by at least 0.5
+        assert time.perf_counter() - start >= 0.075
 
     @pytest.mark.asyncio
-    async def test_multiple_websocket_connections(self):
+    async def test_websocket_truncated_handshake_is_retried(self, monkeypatch):
+        """Test that a server closing the connection mid-handshake is retried like a refused one"""
+        monkeypatch.setattr(global_config, "WS_RETRY_ATTEMPTS", 3)
+        monkeypatch.setattr(global_config, "WS_RETRY_DELAY", 0.001)
+
+        attempts = 0
+
+        async def hang_up(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            nonlocal attempts
+            attempts += 1
+            writer.close()
+
+        server = await asyncio.start_server(hang_up, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server, AsyncTestClient(f"http://127.0.0.1:{port}") as client:
+            with pytest.raises(InvalidMessage):
+                await client.websocket("/ws")
+
+        assert attempts == 3
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_multiple_websocket_connections(self, shared_server, route_prefix):
         """Test handling multiple WebSocket connections simultaneously"""
-        async with create_test_server() as server:
-
-            @server.app.websocket("/ws/{client_id}")
-            async def ws_endpoint(websocket: WebSocket, client_id: str):
-                await websocket.accept()
-                try:
-                    while True:
-                        message = await websocket.receive_text()
-                        await websocket.send_text(f"{client_id}: {message}")
-                except WebSocketDisconnect:
-                    pass
-
-            # Create multiple connections
-            ws1 = await server.client.websocket("/ws/client1")
-            ws2 = await server.client.websocket("/ws/client2")
 
+        @shared_server.app.websocket(f"{route_prefix}/ws/{{client_id}}")
+        async def ws_endpoint(websocket: WebSocket, client_id: str):
+            await websocket.accept()
+            # Each client makes a single round trip
+            message = await websocket.receive_text()
+            await websocket.send_text(f"{client_id}: {message}")
+
+        # Create multiple connections
+        async with (
+            await shared_server.client.websocket(f"{route_prefix}/ws/client1") as ws1,
+            await shared_server.client.websocket(f"{route_prefix}/ws/client2") as ws2,
+        ):
+            # Send messages concurrently
+            await asyncio.gather(
+                shared_server.client.ws.send_text(ws1, "hello1"), shared_server.client.ws.send_text(ws2, "hello2")
+            )
+
+            # Receive responses
+            response1 = await shared_server.client.ws.receive_text(ws1)
+            response2 = await shared_server.client.ws.receive_text(ws2)
+
+            assert response1 == "client1: hello1"
+            assert response2 == "client2: hello2"
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_batched_sends(self, shared_server, route_prefix):
+        """Test that fed messages arrive coalesced in a single length-prefixed frame"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
             try:
-                # Send messages concurrently
-                await asyncio.gather(
-                    server.client.ws.send_text(ws1, "hello1"), server.client.ws.send_text(ws2, "hello2")
-                )
+                while True:
+                    frame = await websocket.receive_bytes()
+                    messages = BatchingWebSocketHelper.unpack_batch(frame)
+                    await websocket.send_json([message.decode() for message in messages])
+            except WebSocketDisconnect:
+                pass
+
+        async with await shared_server.client.websocket(f"{route_prefix}/ws", batch=True) as ws_response:
+            await shared_server.client.ws.feed_text(ws_response, "hello")
+            await shared_server.client.ws.feed_json(ws_response, {"key": "value"})
+            await shared_server.client.ws.feed_binary(ws_response, b"binary")
+            await shared_server.client.ws.flush(ws_response)
+
+            response = await shared_server.client.ws.receive_json(ws_response)
+            assert len(response) == 3
+            assert response[0] == "hello"
+            assert json.loads(response[1]) == {"key": "value"}
+            assert response[2] == "binary"
+
+            # A lone message is flushed by the timer without an explicit flush()
+            await shared_server.client.ws.feed_text(ws_response, "timer")
+            response = await shared_server.client.ws.receive_json(ws_response)
+            assert response == ["timer"]
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_batch_errors(self, shared_server, route_prefix):
+        """Test batching helpers reject unbatched connections and oversized messages"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            with contextlib.suppress(WebSocketDisconnect):
+                await websocket.receive_bytes()
+
+        async with (
+            await shared_server.client.websocket(f"{route_prefix}/ws") as ws_response,
+            await shared_server.client.websocket(f"{route_prefix}/ws", batch=True) as batched_response,
+        ):
+            with pytest.raises(InvalidResponseTypeError, match="not opened with batch=True"):
+                await shared_server.client.ws.feed_text(ws_response, "hello")
+
+            with pytest.raises(ValueError, match="exceeds the batch frame limit"):
+                await shared_server.client.ws.feed_binary(batched_response, b"x" * global_config.WS_MAX_MESSAGE_SIZE)
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_reuse_released_connection(self, shared_server, route_prefix):
+        """Test released connections opened with reuse=True are handed out again"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            try:
+                while True:
+                    await websocket.send_text(await websocket.receive_text())
+            except WebSocketDisconnect:
+                pass
+
+        client = shared_server.client
+        first = await client.websocket(f"{route_prefix}/ws", reuse=True)
+        await client.ws.send_text(first, "hello")
+        assert await client.ws.receive_text(first) == "hello"
+        await client.release_websocket(first)
+
+        # Same path and options: the parked connection is returned without a new handshake
+        second = await client.websocket(f"{route_prefix}/ws", reuse=True)
+        assert second.websocket() is first.websocket()
+        await client.ws.send_text(second, "again")
+        assert await client.ws.receive_text(second) == "again"
+
+        # Different options open a fresh connection
+        other = await client.websocket(f"{route_prefix}/ws", WebSocketConfig(max_queue=8), reuse=True)
+        assert other.websocket() is not second.websocket()
+
+        # Connections not opened with reuse=True are closed on release
+        plain = await client.websocket(f"{route_prefix}/ws")
+        await client.release_websocket(plain)
+        assert plain.websocket().state is State.CLOSED
+
+        with pytest.raises(ValueError, match="cannot be reused"):
+            await client.websocket(f"{route_prefix}/ws", batch=True, reuse=True)
+
+        await client.release_websocket(second)
+        await client.release_websocket(other)
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_context_manager_releases_reusable_connection(self, shared_server, route_prefix):
+        """Test leaving async with on a reuse=True connection parks it instead of closing it"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            with contextlib.suppress(WebSocketDisconnect):
+                while True:
+                    await websocket.send_text(await websocket.receive_text())
+
+        client = shared_server.client
+        async with await client.websocket(f"{route_prefix}/ws", reuse=True) as first:
+            await client.ws.send_text(first, "hello")
+            assert await client.ws.receive_text(first) == "hello"
+
+        assert first.websocket().state is State.OPEN
+        async with await client.websocket(f"{route_prefix}/ws", reuse=True) as second:
+            assert second.websocket() is first.websocket()
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_double_release_parks_once(self, shared_server, route_prefix):
+        """Test releasing a reusable connection twice does not hand it out to two users"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            with contextlib.suppress(WebSocketDisconnect):
+                while True:
+                    await websocket.receive_text()
 
-                # Receive responses
-                response1 = await server.client.ws.receive_text(ws1)
-                response2 = await server.client.ws.receive_text(ws2)
+        client = shared_server.client
+        first = await client.websocket(f"{route_prefix}/ws", reuse=True)
+        await client.release_websocket(first)
+        await client.release_websocket(first)
 
-                assert response1 == "client1: hello1"
-                assert response2 == "client2: hello2"
-            finally:
-                await ws1.websocket().close()
-                await ws2.websocket().close()
+        reused = await client.websocket(f"{route_prefix}/ws", reuse=True)
+        fresh = await client.websocket(f"{route_prefix}/ws", reuse=True)
+        assert reused.websocket() is first.websocket()
+        assert fresh.websocket() is not reused.websocket()
+
+        await client.release_websocket(reused)
+        await client.release_websocket(fresh)
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_stale_release_keeps_connection_in_use(self, shared_server, route_prefix):
+        """Test releasing an already released handle does not park the connection its next user holds"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            with contextlib.suppress(WebSocketDisconnect):
+                while True:
+                    await websocket.receive_text()
+
+        client = shared_server.client
+        first = await client.websocket(f"{route_prefix}/ws", reuse=True)
+        await client.release_websocket(first)
+        second = await client.websocket(f"{route_prefix}/ws", reuse=True)
+        assert second.websocket() is first.websocket()
+
+        await client.release_websocket(first)
+        third = await client.websocket(f"{route_prefix}/ws", reuse=True)
+        assert third.websocket() is not second.websocket()
+
+        await client.release_websocket(second)
+        await client.release_websocket(third)
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_close_parked_connection_through_other_handle(self, shared_server, route_prefix):
+        """Test closing a parked connection through a handle without its pool key removes it from the pool"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            with contextlib.suppress(WebSocketDisconnect):
+                while True:
+                    await websocket.receive_text()
+
+        client = shared_server.client
+        parked = await client.websocket(f"{route_prefix}/ws", reuse=True)
+        await client.release_websocket(parked)
+
+        await client.close_websocket(AsyncTestResponse(parked.websocket()))
+        assert parked.websocket().state is State.CLOSED
+
+        fresh = await client.websocket(f"{route_prefix}/ws", reuse=True)
+        assert fresh.websocket() is not parked.websocket()
+        await client.release_websocket(fresh)
+
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_websocket_compression_defaults_off_for_loopback(self, shared_server, route_prefix):
+        """Test permessage-deflate is only negotiated on loopback when explicitly configured"""
+
+        @shared_server.app.websocket(f"{route_prefix}/ws")
+        async def ws_endpoint(websocket: WebSocket):
+            await websocket.accept()
+            with contextlib.suppress(WebSocketDisconnect):
+                await websocket.receive_text()
+
+        async with (
+            await shared_server.client.websocket(f"{route_prefix}/ws") as ws_response,
+            await shared_server.client.websocket(
+                f"{route_prefix}/ws", WebSocketConfig(compression="deflate")
+            ) as compressed_response,
+        ):
+            assert ws_response.websocket().protocol.extensions == []
+            assert len(compressed_response.websocket().protocol.extensions) == 1
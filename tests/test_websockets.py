@@ -1,10 +1,9 @@
-import json
 import logging
 
+import orjson
 import pytest
 from fastapi import WebSocket, WebSocketDisconnect
 from websockets.exceptions import ConnectionClosedError
-from websockets.protocol import State
 
 from fastapi_testing import create_test_server
 from fastapi_testing.async_fastapi_testing import WebSocketConfig
@@ -38,13 +37,13 @@ async def echo_handler(websocket: WebSocket):
 
                 if "text" in message:
                     try:
-                        data = json.loads(message["text"])
-                    except json.JSONDecodeError as e:
+                        data = orjson.loads(message["text"])
+                    except orjson.JSONDecodeError as e:
                         logger.error(f"JSON decode error: {e}")
                         # Gracefully close the connection with code 1003 (Unsupported Data)
                         await websocket.close(code=1003)
                         return
-                    await websocket.send_json(data)
+                    await websocket.send_text(orjson.dumps(data).decode())
                 elif "bytes" in message:
                     await websocket.send_bytes(message["bytes"])
             except WebSocketDisconnect:
@@ -65,9 +64,7 @@ async def test_mixed_protocols(test_server):
 
     config = WebSocketConfig(subprotocols=["test-protocol"], ping_interval=20.0, ping_timeout=20.0)
 
-    ws_response = await test_server.client.websocket("/ws/echo", config)
-
-    try:
+    async with await test_server.client.websocket("/ws/echo", config) as ws_response:
         test_json = {"message": "test"}
         await test_server.client.ws.send_json(ws_response, test_json)
         response = await test_server.client.ws.receive_json(ws_response)
@@ -77,22 +74,21 @@ async def test_mixed_protocols(test_server):
         await test_server.client.ws.send_binary(ws_response, test_data)
         response = await test_server.client.ws.receive_binary(ws_response)
         assert response == test_data
-    finally:
-        await ws_response.websocket().close()
+
+        # msgpack payloads travel as binary frames, so the echo path returns them unchanged
+        await test_server.client.ws.send_msgpack(ws_response, test_json)
+        response = await test_server.client.ws.receive_msgpack(ws_response)
+        assert response == test_json
 
 
 @pytest.mark.asyncio
 async def test_invalid_websocket_json(test_server):
     """Test that sending invalid JSON over WebSocket gracefully closes the connection."""
     config = WebSocketConfig(subprotocols=["test-protocol"])
-    ws_response = await test_server.client.websocket("/ws/echo", config)
-    try:
+    # Closing on exit is a no-op once the server has closed the connection
+    async with await test_server.client.websocket("/ws/echo", config) as ws_response:
         # Send a non-JSON string using the helper.
         await test_server.client.ws.send_text(ws_response, "invalid json")
         with pytest.raises(ConnectionClosedError):
             # The server should close the connection upon receiving invalid JSON.
             await test_server.client.ws.receive_json(ws_response)
-    finally:
-        # Ensure the connection is closed if still open.
-        if ws_response.websocket().state != State.CLOSED:
-            await ws_response.websocket().close()